@@ -1,9 +1,14 @@
+import argparse
 import asyncio
 import asyncpg
+import functools
+import logging
 import os
-import json
-import pandas as pd
+import orjson
+import pyarrow as pa
+import pyarrow.csv as pv
 from datetime import datetime
+from operator import itemgetter
 from dotenv import load_dotenv
 
 # --- Load environment variables ---
@@ -15,28 +20,78 @@ if not DB_DSN:
 OUTPUT_DIR = "./exports"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 CSV_OUTPUT_FILE = os.path.join(OUTPUT_DIR, "latest_s2_courses.csv")
+CURSOR_PREFETCH = 1000
+LOG_EVERY_N_ROWS = 1000
 
+logger = logging.getLogger("flatten_csv")
 
-def safe_get(d, path, default=None):
-    """Safely fetch nested JSON fields using dot-separated path."""
-    try:
-        for p in path.split("."):
+
+def make_accessor(path):
+    """Compile a dot-separated path into a getter(d, default=None) callable.
+
+    The path is split once up front so repeated lookups skip the parsing.
+    Lists along the path resolve to their first element.
+    """
+    segs = tuple(path.split("."))
+
+    def get(d, default=None):
+        for p in segs:
             if isinstance(d, list):
                 d = d[0] if d else {}
-            d = d.get(p, {})
-        if isinstance(d, (str, int, float)):
-            return d
+            if not isinstance(d, dict):
+                return default
+            d = d.get(p)
+            if d is None:
+                return default
         return d
-    except Exception:
-        return default
+
+    return get
+
+@functools.lru_cache(maxsize=None)
+def _accessor_for(path):
+    return make_accessor(path)
+
+def safe_get(d, path, default=None):
+    """Safely fetch nested JSON fields using dot-separated path."""
+    return _accessor_for(path)(d, default)
+
+# Accessors for the fixed set of blueprint fields read by the exporter
+GET_BLUEPRINT = make_accessor("blueprint")
+GET_COURSE_TITLE = make_accessor("course_title")
+GET_SUMMARY = make_accessor("summary")
+GET_COMPETENCIES = make_accessor("competencies")
+GET_MODULES = make_accessor("modules")
+GET_LEARNING_OBJECTIVES = make_accessor("learning_objectives")
+GET_ASSESSMENT_FRAMEWORK = make_accessor("assessment_framework")
+GET_QUESTIONS = make_accessor("questions")
+
+# Every CSV column is written as text. Values such as a title, token count or
+# timestamp may come back as different Python types across rows, and Arrow's
+# per-column type inference would reject such a mix.
+EXPORT_COLUMNS = (
+    "Course ID", "Course Title", "Summary", "Competencies", "Modules",
+    "Learning Objectives", "Assessment Framework", "Questions", "Total Tokens",
+    "Status", "Generated At",
+)
+EXPORT_SCHEMA = pa.schema([(name, pa.string()) for name in EXPORT_COLUMNS])
+
+def to_cell(value):
+    """Render one value as CSV text (None becomes an empty cell, as pandas wrote it)."""
+    if value is None:
+        return None
+    return value if isinstance(value, str) else str(value)
+
+# C-level field extraction for MCQ options and MTF pairs
+_INDEX_TEXT = itemgetter("index", "text")
+_LEFT_RIGHT = itemgetter("left", "right")
 
 def format_competencies(data, key):
         """Convert list of competency dicts into readable text format."""
         comps = safe_get(data, key, [])
         if isinstance(comps, str):
             try:
-                comps = json.loads(comps)
-            except json.JSONDecodeError:
+                comps = orjson.loads(comps)
+            except orjson.JSONDecodeError:
                 return ""
         if not isinstance(comps, list):
             return ""
@@ -49,11 +104,91 @@ def format_competencies(data, key):
                 formatted.append(f"Theme:  {theme}\nSubTheme: {subtheme}")
         return "\n\n-----------\n\n".join(formatted)
 
+def format_row(blueprint, assessment, llm_usage):
+    """Flatten one exported row into its text columns.
+
+    Returns (course_title, summary, competencies, modules, learning_objectives,
+    assessment_framework, questions, total_tokens).
+    """
+    if isinstance(blueprint, str): blueprint = orjson.loads(blueprint)
+    if isinstance(assessment, str): assessment = orjson.loads(assessment)
+    if isinstance(llm_usage, str): llm_usage = orjson.loads(llm_usage)
+
+    # Extract Token Usage
+    total_tokens = 0
+    if isinstance(llm_usage, dict):
+        total_tokens = llm_usage.get('total_token_count', 0)
+
+    # Handle cases where blueprint might be inside a 'blueprint' key or at root
+    bp_root = GET_BLUEPRINT(blueprint, blueprint) if blueprint else {}
+
+    # Extract Blueprint Fields
+    course_title = GET_COURSE_TITLE(bp_root, '')
+    summary = GET_SUMMARY(bp_root, '')
+    competencies = GET_COMPETENCIES(bp_root, {})
+    modules = GET_MODULES(bp_root, [])
+    learning_objectives = GET_LEARNING_OBJECTIVES(bp_root, [])
+    assessment_framework = GET_ASSESSMENT_FRAMEWORK(bp_root, {})
+
+    # Format Competencies
+    comp_str = ""
+    if isinstance(competencies, dict):
+        comp_str = "\n".join([
+            f"{k.capitalize()}: {', '.join(v)}"
+            for k, v in competencies.items() if isinstance(v, list)
+        ])
+
+    # Format Modules
+    mod_str = "\n".join([f"{m.get('id', '')}. {m.get('title', '')}" for m in modules]) if isinstance(modules, list) else ""
+
+    # Format Learning Objectives
+    lo_str = "\n".join([f"- {lo}" for lo in learning_objectives]) if isinstance(learning_objectives, list) else ""
+
+    # Format Assessment Framework
+    af_str = ""
+    if isinstance(assessment_framework, dict):
+        af_list = []
+        diff = assessment_framework.get('difficulty_levels', [])
+        if diff: af_list.append(f"Difficulty: {', '.join(diff)}")
+
+        q_types = assessment_framework.get('question_types', {})
+        if q_types:
+            af_list.append("Question Types:")
+            af_list.extend([f"  - {k}: {v}" for k, v in q_types.items()])
+
+        eval_pol = assessment_framework.get('evaluation_policy', {})
+        if eval_pol:
+            af_list.append(f"Passing: {eval_pol.get('passing_criteria', '')}")
+
+        af_str = "\n".join(af_list)
+
+    # Format Questions
+    questions = GET_QUESTIONS(assessment, []) if assessment else []
+    question_parts = []
+    for idx, q in enumerate(questions, 1):
+        q_get = q.get
+        q_type = q_get('question_type', '')
+        q_ans = ""
+        if q_type == 'Multiple Choice Question':
+            opts = ', '.join(f"{i}. {t}" for i, t in map(_INDEX_TEXT, q_get('options', ())))
+            q_ans = f"Options: {opts} | Correct: {q_get('correct_option_index')}"
+        elif q_type == 'FTB Question':
+            q_ans = f"Answer: {q_get('correct_answer')}"
+        elif q_type == 'MTF Question':
+            pairs = '; '.join(f"{l} -> {r}" for l, r in map(_LEFT_RIGHT, q_get('pairs', ())))
+            q_ans = f"Pairs: {pairs}"
+
+        question_parts.append(f"Q{idx} [{q_type}]: {q_get('question_text', '')}\n   {q_ans}\n   Rationale: {q_get('rationale')}\n\n")
+    questions_formatted = ''.join(question_parts)
+
+    return course_title, summary, comp_str, mod_str, lo_str, af_str, questions_formatted, total_tokens
+
 async def export_filtered_fields():
+    run_ts = datetime.now().strftime('%Y%m%d_%H%M%S')
     conn = None
     try:
         conn = await asyncpg.connect(DB_DSN)
-        print("✅ Connected to PostgreSQL")
+        logger.info("✅ Connected to PostgreSQL")
 
         query = """
         SELECT 
@@ -67,116 +202,75 @@ async def export_filtered_fields():
         WHERE status = 'success';
         """
 
-        rows = await conn.fetch(query)
-        print(f"📦 Retrieved {len(rows)} rows")
-
-        extracted_data = []
-
-        for row in rows:
-            blueprint = row["blueprint_json"]
-            assessment = row["assessment_json"]
-            llm_usage = row["llm_usage_json"]
-
-            if isinstance(blueprint, str): blueprint = json.loads(blueprint)
-            if isinstance(assessment, str): assessment = json.loads(assessment)
-            if isinstance(llm_usage, str): llm_usage = json.loads(llm_usage)
-            
-            # Extract Token Usage
-            total_tokens = 0
-            if isinstance(llm_usage, dict):
-                total_tokens = llm_usage.get('total_token_count', 0)
-
-            # Handle cases where blueprint might be inside a 'blueprint' key or at root
-            bp_root = blueprint.get('blueprint', blueprint) if blueprint else {}
-            
-            # Extract Blueprint Fields
-            course_title = bp_root.get('course_title', '')
-            summary = bp_root.get('summary', '')
-            competencies = bp_root.get('competencies', {})
-            modules = bp_root.get('modules', [])
-            learning_objectives = bp_root.get('learning_objectives', [])
-            assessment_framework = bp_root.get('assessment_framework', {})
-            
-            # Format Competencies
-            comp_str = ""
-            if isinstance(competencies, dict):
-                comp_list = []
-                for k, v in competencies.items():
-                    if isinstance(v, list):
-                        comp_list.append(f"{k.capitalize()}: {', '.join(v)}")
-                comp_str = "\n".join(comp_list)
-            
-            # Format Modules
-            mod_str = "\n".join([f"{m.get('id', '')}. {m.get('title', '')}" for m in modules]) if isinstance(modules, list) else ""
-            
-            # Format Learning Objectives
-            lo_str = "\n".join([f"- {lo}" for lo in learning_objectives]) if isinstance(learning_objectives, list) else ""
-            
-            # Format Assessment Framework
-            af_str = ""
-            if isinstance(assessment_framework, dict):
-                af_list = []
-                diff = assessment_framework.get('difficulty_levels', [])
-                if diff: af_list.append(f"Difficulty: {', '.join(diff)}")
-                
-                q_types = assessment_framework.get('question_types', {})
-                if q_types: 
-                    af_list.append("Question Types:")
-                    for k, v in q_types.items():
-                        af_list.append(f"  - {k}: {v}")
-                        
-                eval_pol = assessment_framework.get('evaluation_policy', {})
-                if eval_pol:
-                    af_list.append(f"Passing: {eval_pol.get('passing_criteria', '')}")
-                
-                af_str = "\n".join(af_list)
-
-            # Format Questions
-            questions = assessment.get('questions', []) if assessment else []
-            questions_formatted = ""
-            for idx, q in enumerate(questions, 1):
-                q_text = q.get('question_text', '')
-                q_type = q.get('question_type', '')
-                q_ans = ""
-                if q_type == 'Multiple Choice Question':
-                    opts = [f"{o['index']}. {o['text']}" for o in q.get('options', [])]
-                    q_ans = f"Options: {', '.join(opts)} | Correct: {q.get('correct_option_index')}"
-                elif q_type == 'FTB Question':
-                    q_ans = f"Answer: {q.get('correct_answer')}"
-                elif q_type == 'MTF Question':
-                    pairs = [f"{p['left']} -> {p['right']}" for p in q.get('pairs', [])]
-                    q_ans = f"Pairs: {'; '.join(pairs)}"
-                
-                questions_formatted += f"Q{idx} [{q_type}]: {q_text}\n   {q_ans}\n   Rationale: {q.get('rationale')}\n\n"
-
-            extracted_data.append({
-                "Course ID": row["course_id"],
-                "Course Title": course_title,
-                "Summary": summary,
-                "Competencies": comp_str,
-                "Modules": mod_str,
-                "Learning Objectives": lo_str,
-                "Assessment Framework": af_str,
-                "Questions": questions_formatted,
-                "Total Tokens": total_tokens,
-                "Status": row["status"],
-                "Generated At": row["generated_at"]
-            })
-            
-        if not extracted_data:
-            print("⚠️ No data to export.")
+        # Column-oriented accumulators: one list per output column keeps the
+        # per-row cost to a handful of appends instead of a fresh dict.
+        course_ids = []
+        course_titles = []
+        summaries = []
+        competencies_col = []
+        modules_col = []
+        objectives_col = []
+        frameworks_col = []
+        questions_col = []
+        tokens_col = []
+        statuses = []
+        generated_ats = []
+
+        # Stream rows through a server-side cursor so memory stays bounded
+        # by the prefetch window rather than the table size.
+        async with conn.transaction():
+            async for row in conn.cursor(query, prefetch=CURSOR_PREFETCH):
+                (course_title, summary, comp_str, mod_str, lo_str, af_str,
+                 questions_formatted, total_tokens) = format_row(
+                    row["blueprint_json"], row["assessment_json"], row["llm_usage_json"]
+                )
+
+                course_ids.append(row["course_id"])
+                course_titles.append(course_title)
+                summaries.append(summary)
+                competencies_col.append(comp_str)
+                modules_col.append(mod_str)
+                objectives_col.append(lo_str)
+                frameworks_col.append(af_str)
+                questions_col.append(questions_formatted)
+                tokens_col.append(total_tokens)
+                statuses.append(row["status"])
+                generated_ats.append(row["generated_at"])
+
+                if len(course_ids) % LOG_EVERY_N_ROWS == 0:
+                    logger.debug(f"… processed {len(course_ids)} rows")
+
+        logger.info(f"📦 Retrieved {len(course_ids)} rows")
+
+        if not course_ids:
+            logger.warning("⚠️ No data to export.")
             return
 
-        df = pd.DataFrame(extracted_data)
-        output_file = os.path.join(OUTPUT_DIR, f"assessment_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-        df.to_csv(output_file, index=False)
-        print(f"✅ Exported to {output_file}")
+        columns = (
+            course_ids, course_titles, summaries, competencies_col, modules_col,
+            objectives_col, frameworks_col, questions_col, tokens_col, statuses, generated_ats,
+        )
+        table = pa.Table.from_pydict(
+            {name: [to_cell(v) for v in col] for name, col in zip(EXPORT_COLUMNS, columns)},
+            schema=EXPORT_SCHEMA,
+        )
+        output_file = os.path.join(OUTPUT_DIR, f"assessment_export_{run_ts}.csv")
+        pv.write_csv(table, output_file, write_options=pv.WriteOptions(include_header=True))
+        logger.info(f"✅ Exported to {output_file}")
 
     except Exception as e:
-        print(f"❌ Error: {e}")
+        logger.error(f"❌ Error: {e}")
     finally:
         if conn:
             await conn.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export generated assessments to CSV.")
+    parser.add_argument("--verbose", action="store_true", help="Log progress while rows are processed")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
     asyncio.run(export_filtered_fields())
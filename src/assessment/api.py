@@ -1,20 +1,31 @@
+import io
 import os
+import time
+import re
+import uuid
 import shutil
+import csv
+import hashlib
+import asyncio
 import logging
-import json
-import pandas as pd
+import orjson
+import aiofiles
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 from fastapi import FastAPI, BackgroundTasks, UploadFile, File, Form, HTTPException, APIRouter
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field
 from fastapi.openapi.utils import get_openapi
 from contextlib import asynccontextmanager
 
-from .config import INTERACTIVE_COURSES_PATH
-from .db import init_db, create_job, update_job_status, get_assessment_status, save_assessment_result
+from .config import INTERACTIVE_COURSES_PATH, UPLOAD_BLOBS_PATH, UPLOAD_MAX_MB, UPLOAD_BLOB_TTL_SECONDS, COURSE_FETCH_CONCURRENCY, JOB_WORKERS, JOB_QUEUE_SIZE, JOB_HEARTBEAT_SECONDS
+from .db import init_db, close_db, claim_job, touch_jobs, update_job_status, get_job_status_light, get_assessment_full, get_completed_assessment, save_assessment_result
 from .fetcher import fetch_course_data
-from .generator import generate_assessment
-from .exporters import generate_pdf, generate_docx
+from .generator import generate_assessment, shutdown_pdf_pool
+from .exporters import generate_pdf, generate_docx, RENDER_VERSION
 
 # Configure Logging
 logging.basicConfig(
@@ -26,15 +37,51 @@ logging.basicConfig(
 )
 logger = logging.getLogger("assessment-api")
 
+# Caps course fetches against the Karmayogi API across all running jobs
+_course_fetch_limit = asyncio.Semaphore(COURSE_FETCH_CONCURRENCY)
+# Live job stage for /progress, kept by the process that runs the job: job_id -> stage.
+# Waiters park on an Event that is swapped out (and set) on every stage change.
+PROGRESS_PCT = {"PENDING": 0, "IN_PROGRESS": 5, "FETCHING": 10, "GENERATING": 30, "SAVING": 90, "COMPLETED": 100, "FAILED": 100}
+PROGRESS_HEARTBEAT = 15
+_job_progress: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+_progress_events: Dict[str, asyncio.Event] = {}
+
+def _set_progress(job_id: str, stage: str):
+    _job_progress[job_id] = stage
+    event = _progress_events.pop(job_id, None)
+    if event:
+        event.set()
+
+# Threads available to asyncio.to_thread / run_in_executor(None, ...)
+DEFAULT_EXECUTOR_WORKERS = 16
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up Assessment API...")
+    # Blocking file/PDF work is pushed to the loop's default executor; size it explicitly
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=DEFAULT_EXECUTOR_WORKERS, thread_name_prefix="assessment-io")
+    )
     try:
         await init_db()
     except Exception as e:
         logger.error(f"Database connection failed: {e}")
+    # Generation jobs are drained by a fixed set of workers, bounding how many
+    # Gemini calls run at once regardless of request rate
+    app.state.job_queue = asyncio.Queue(maxsize=JOB_QUEUE_SIZE)
+    workers = [
+        asyncio.create_task(_job_worker(app.state.job_queue), name=f"assessment-worker-{i}")
+        for i in range(JOB_WORKERS)
+    ]
+    workers.append(asyncio.create_task(_blob_sweeper(), name="blob-sweeper"))
+    workers.append(asyncio.create_task(_job_heartbeat(), name="job-heartbeat"))
     yield
     logger.info("Shutting down Assessment API...")
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    await asyncio.to_thread(shutdown_pdf_pool)
+    await close_db()
 
 app = FastAPI(
     title="Course Assessment Generator API (v1.0)",
@@ -47,6 +94,9 @@ app = FastAPI(
     openapi_url="/openapi.json"
 )
 
+# COMPLETED /status payloads carry the whole assessment; compress anything non-trivial
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Routers
 api_v1_router = APIRouter(prefix="/api/v1")
 
@@ -61,11 +111,48 @@ async def health():
 
 @api_v1_router.get("/status/{job_id}")
 async def check_status(job_id: str):
-    status = await get_assessment_status(job_id)
+    status = await get_job_status_light(job_id)
     if not status:
         return JSONResponse(status_code=404, content={"status": "NOT_FOUND"})
+    # Only a finished job carries results worth shipping back to the poller
+    if status['status'] == 'COMPLETED':
+        return await get_assessment_full(job_id) or status
     return status
 
+@api_v1_router.get("/progress/{job_id}")
+async def progress(job_id: str):
+    """
+    Server-sent events: one `{"stage", "pct"}` event per stage change, ending
+    after COMPLETED or FAILED. Jobs run by another process fall back to their
+    DB status, re-read every PROGRESS_HEARTBEAT seconds.
+    """
+    if not await get_job_status_light(job_id):
+        return JSONResponse(status_code=404, content={"status": "NOT_FOUND"})
+
+    async def events():
+        last = None
+        while True:
+            # Register before reading the stage so a change in between still wakes us
+            changed = _progress_events.setdefault(job_id, asyncio.Event())
+            stage = _job_progress.get(job_id)
+            if stage is None:
+                row = await get_job_status_light(job_id)
+                stage = row['status'] if row else "FAILED"
+            if stage != last:
+                yield b"data: " + orjson.dumps({"stage": stage, "pct": PROGRESS_PCT.get(stage, 0)}) + b"\n\n"
+                last = stage
+            if stage in ("COMPLETED", "FAILED"):
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), PROGRESS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 from enum import Enum
 from typing import List, Optional, Dict
 
@@ -101,9 +188,21 @@ class QuestionType(str, Enum):
     MULTICHOICE = "multichoice"
     TRUE_FALSE = "truefalse"
 
+_VALID_Q_TYPES = frozenset(t.value for t in QuestionType)
+
+def _split_form_list(values: List[str]) -> List[str]:
+    # Form lists arrive either as repeated fields or one comma-separated string;
+    # only pay for splitting when a comma is actually present
+    if not any("," in v for v in values):
+        return [v for v in map(str.strip, values) if v]
+    return [c for v in values for c in map(str.strip, v.split(",")) if c]
+
+def _normalize_topics(values: List[str]) -> Optional[List[str]]:
+    # Shared by /generate and /generate_json so equal topic lists fingerprint (and prompt) the same
+    return _split_form_list(values) or None
+
 @api_v1_router.post("/generate")
 async def generate(
-    background_tasks: BackgroundTasks,
     course_ids: Optional[List[str]] = Form(None, description="List of Course IDs (or comma-separated string)"),
     force: bool = Form(False),
     assessment_type: AssessmentType = Form(...),
@@ -119,6 +218,7 @@ async def generate(
     language: Language = Form(Language.ENGLISH),
     blooms_config: Optional[str] = Form("", description="JSON string of Bloom's %"),
     additional_instructions: Optional[str] = Form(""),
+    blob_ids: Optional[str] = Form(None, description="Comma-separated ids returned by /upload_blob"),
     files: Optional[List[Union[UploadFile, str]]] = File(None)
 ):
     # Robust File Handling (Workaround for Swagger UI defaults)
@@ -138,62 +238,78 @@ async def generate(
     if additional_instructions in ["string", ""]: additional_instructions = None
     
     # Parse List Inputs (Support both List[str] and comma-separated string fallback)
-    c_ids = []
-    if course_ids:
-        for item in course_ids:
-            c_ids.extend([c.strip() for c in item.split(",") if c.strip()])
+    c_ids = _split_form_list(course_ids) if course_ids else []
     
-    # Validation: Must have Content
-    if not c_ids and not valid_files:
-        raise HTTPException(status_code=400, detail="Must provide either Course ID(s) or Uploaded Files.")
-
-    q_types = []
-    for item in question_types:
-        q_types.extend([q.strip().lower() for q in item.split(",") if q.strip()])
-
-    # Validate Question Types
-    valid_types = {t.value for t in QuestionType}
-    for qt in q_types:
-        if qt not in valid_types:
-             raise HTTPException(status_code=400, detail=f"Invalid question type: {qt}. Allowed: {valid_types}")
-
-    question_type_counts: Dict[str, int] = json.loads(question_type_counts)
-    for qtype, count in question_type_counts.items():
-        if qtype not in valid_types:
-            raise HTTPException(400, f"Unknown question type: {qtype}")
-        if count <= 0:
-            raise HTTPException(400, f"Invalid question count for {qtype}")
+    blob_files = await _resolve_blobs(_split_form_list([blob_ids]) if blob_ids and blob_ids != "string" else [])
 
+    q_types = [q.lower() for q in _split_form_list(question_types)]
+    counts: Dict[str, int] = orjson.loads(question_type_counts)
 
-    t_names = [t.strip() for t in topic_names.split(",")] if topic_names else None
+    t_names = _normalize_topics([topic_names]) if topic_names else None
     
     # Parse Bloom's Config
     b_dist = None
     if blooms_config:
         try:
-            b_dist = json.loads(blooms_config)
-        except json.JSONDecodeError:
+            b_dist = orjson.loads(blooms_config)
+        except orjson.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid JSON for blooms_config")
 
-    import hashlib
-    # Generate Parameter Hash for Cache Invalidation
-    param_list = [
-        str(assessment_type),
-        str(difficulty),
-        str(total_questions),
-        str(question_type_counts),
-        str(sorted(question_types)), # Sort for consistency
-        str(time_limit),
-        str(topic_names),
-        str(language),
-        str(blooms_config),
-        str(additional_instructions)
-    ]
-    if files:
-         param_list.extend([f.filename for f in valid_files])
+    return await _start_generation(
+        c_ids, valid_files, blob_files, assessment_type, difficulty, total_questions,
+        counts, q_types, time_limit, t_names, language, b_dist, additional_instructions, force
+    )
+
+async def _start_generation(
+    c_ids: List[str],
+    files: List[UploadFile],
+    blob_files: List[Path],
+    assessment_type: AssessmentType,
+    difficulty: Difficulty,
+    total_questions: int,
+    question_type_counts: Dict[str, int],
+    q_types: List[str],
+    time_limit: Optional[int],
+    t_names: Optional[List[str]],
+    language: Language,
+    b_dist: Optional[Dict[str, int]],
+    additional_instructions: Optional[str],
+    force: bool,
+):
+    """Validates parsed /generate inputs, claims the job and queues it; shared by the form and JSON endpoints."""
+    # Validation: Must have Content
+    if not c_ids and not files and not blob_files:
+        raise HTTPException(status_code=400, detail="Must provide either Course ID(s) or Uploaded Files.")
+
+    # Validate Question Types
+    bad = set(q_types) - _VALID_Q_TYPES
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Invalid question type(s): {sorted(bad)}. Allowed: {sorted(_VALID_Q_TYPES)}")
+
+    bad_counts = question_type_counts.keys() - _VALID_Q_TYPES
+    if bad_counts:
+        raise HTTPException(400, f"Unknown question type: {', '.join(sorted(bad_counts))}")
+    for qtype, count in question_type_counts.items():
+        if count <= 0:
+            raise HTTPException(400, f"Invalid question count for {qtype}")
 
-    param_str = "_".join(param_list)
-    param_hash = hashlib.md5(param_str.encode()).hexdigest()[:8]
+
+    # Request fingerprint for cache reuse: normalised so semantically equal
+    # requests (key order, ""/None, list order) map to the same job
+    fingerprint = {
+        "type": assessment_type.value,
+        "diff": difficulty.value,
+        "total": total_questions,
+        "qtc": question_type_counts,
+        "qtypes": sorted(set(q_types)),
+        "time": time_limit,
+        "topics": sorted(t_names) if t_names else None,
+        "lang": language.value,
+        "bloom": b_dist,
+        "extra": additional_instructions or None,
+        "files": sorted([f.filename for f in files] + [p.name for p in blob_files]),
+    }
+    param_hash = hashlib.blake2b(orjson.dumps(fingerprint, option=orjson.OPT_SORT_KEYS), digest_size=8).hexdigest()
 
     # Composite Key for Caching (Sorted course IDs + Hash)
     if c_ids:
@@ -204,46 +320,213 @@ async def generate(
         
     composite_id = f"{base_id}_{param_hash}"
 
-    existing = await get_assessment_status(composite_id)
-    if existing and existing['status'] == 'COMPLETED' and not force:
-        return {"message": "Assessment already exists", "status": "COMPLETED", "job_id": composite_id}
-    
-    if existing and existing['status'] == 'IN_PROGRESS':
+    # Single round-trip claim; concurrent identical requests cannot both start a job
+    claimed, current_status = await claim_job(composite_id, force)
+    if not claimed:
+        if current_status == 'COMPLETED':
+            return {"message": "Assessment already exists", "status": "COMPLETED", "job_id": composite_id}
+        if current_status == 'PENDING':
+            return {"message": "Assessment generation queued", "status": "PENDING", "job_id": composite_id}
         return {"message": "Assessment generation in progress", "status": "IN_PROGRESS", "job_id": composite_id}
 
-    await create_job(composite_id)
-    
-    saved_files = []
-    if files:
-        # Use first course ID for temp storage OR 'custom_uploads' folder if no course ID
-        storage_folder_name = sorted_ids[0] if c_ids else "custom_uploads"
-        temp_dir = Path(INTERACTIVE_COURSES_PATH) / storage_folder_name / "uploads"
-        temp_dir.mkdir(parents=True, exist_ok=True)
-        for file in files:
-            file_path = temp_dir / file.filename
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            saved_files.append(file_path)
-            logger.info(f"Successfully saved uploaded file: {file.filename} to {file_path}")
-
-    background_tasks.add_task(
-        process_course_task, 
-        composite_id, 
-        c_ids, 
-        saved_files, 
-        assessment_type, 
-        difficulty, 
-        total_questions, 
-        question_type_counts,
-        additional_instructions, 
-        language,
-        t_names,
-        b_dist,
-        q_types,
-        time_limit
-    )
+    # The row is already PENDING; never leave it that way without a queued job behind it
+    try:
+        clear_exports(composite_id)
+
+        saved_files = []
+        if files:
+            # Use first course ID for temp storage OR 'custom_uploads' folder if no course ID
+            storage_folder_name = sorted_ids[0] if c_ids else "custom_uploads"
+            temp_dir = INTERACTIVE_COURSES_PATH / storage_folder_name / "uploads"
+            await _ensure_dir(temp_dir)
+            for file in files:
+                file_path = temp_dir / file.filename
+                await _save_upload(file, file_path)
+                saved_files.append(file_path)
+                logger.info(f"Successfully saved uploaded file: {file.filename} to {file_path}")
+        # Pre-uploaded blobs are already on disk; hand their paths over as is
+        saved_files.extend(blob_files)
+
+        app.state.job_queue.put_nowait((
+            composite_id, 
+            c_ids, 
+            saved_files, 
+            assessment_type, 
+            difficulty, 
+            total_questions, 
+            question_type_counts,
+            additional_instructions, 
+            language,
+            t_names,
+            b_dist,
+            q_types,
+            time_limit,
+            force
+        ))
+        _live_jobs.add(composite_id)
+    except asyncio.QueueFull:
+        # Backpressure: hand the row back (FAILED is claimable again) and let the client retry
+        logger.warning(f"Job queue full, rejecting {composite_id}")
+        await update_job_status(composite_id, "FAILED", "Server busy: job queue full")
+        raise HTTPException(status_code=503, detail="Too many queued jobs, retry later", headers={"Retry-After": "30"})
+    except Exception as e:
+        logger.exception(f"Failed to queue job {composite_id}")
+        await update_job_status(composite_id, "FAILED", str(e))
+        raise
+    _set_progress(composite_id, "PENDING")
     return {"message": "Generation started", "status": "PENDING", "job_id": composite_id}
 
+class GenerateRequest(BaseModel):
+    course_ids: List[str] = []
+    force: bool = False
+    assessment_type: AssessmentType
+    difficulty: Difficulty
+    total_questions: int = 5
+    question_type_counts: Dict[str, int] = Field(
+        default_factory=lambda: {"mcq": 5, "ftb": 5, "mtf": 5, "multichoice": 5, "truefalse": 5}
+    )
+    question_types: List[str] = ["mcq", "ftb", "mtf", "multichoice", "truefalse"]
+    time_limit: Optional[int] = Field(None, description="Time limit in minutes")
+    topic_names: Optional[List[str]] = None
+    language: Language = Language.ENGLISH
+    blooms_config: Optional[Dict[str, int]] = Field(None, description="Bloom's level -> %")
+    additional_instructions: Optional[str] = None
+    blob_ids: List[str] = Field([], description="Ids returned by /upload_blob")
+
+@api_v1_router.post("/generate_json")
+async def generate_json(req: GenerateRequest):
+    """
+    Same as /generate for clients without direct file uploads: the body is one
+    JSON document, so counts and Bloom's config arrive as native objects.
+    Attach files via /upload_blob and `blob_ids`.
+    """
+    t_names = _normalize_topics(req.topic_names) if req.topic_names else None
+    return await _start_generation(
+        _split_form_list(req.course_ids), [], await _resolve_blobs(req.blob_ids),
+        req.assessment_type, req.difficulty, req.total_questions, req.question_type_counts,
+        [q.lower() for q in _split_form_list(req.question_types)], req.time_limit,
+        t_names, req.language, req.blooms_config or None, req.additional_instructions or None, req.force
+    )
+
+_BLOB_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+@api_v1_router.post("/upload_blob")
+async def upload_blob(file: UploadFile = File(...)):
+    """
+    Stores one file ahead of /generate so a client can upload several files in
+    parallel, then pass the returned ids as `blob_ids`.
+    """
+    max_bytes = UPLOAD_MAX_MB * 1024 * 1024
+    too_large = HTTPException(status_code=413, detail=f"File exceeds the {UPLOAD_MAX_MB} MB upload limit")
+    if file.size is not None and file.size > max_bytes:
+        raise too_large
+    blob_id = uuid.uuid4().hex
+    blob_dir = UPLOAD_BLOBS_PATH / blob_id
+    await asyncio.to_thread(blob_dir.mkdir, parents=True)
+    file_path = blob_dir / Path(file.filename or "upload").name
+    await _save_upload(file, file_path)
+    # Clients need not send a size up front; check what actually landed on disk
+    if (await asyncio.to_thread(file_path.stat)).st_size > max_bytes:
+        await asyncio.to_thread(shutil.rmtree, blob_dir, True)
+        raise too_large
+    logger.info(f"Stored upload blob {blob_id}: {file_path.name}")
+    return {"blob_id": blob_id, "filename": file_path.name}
+
+@api_v1_router.delete("/upload_blob/{blob_id}")
+async def delete_blob(blob_id: str):
+    """Discards a blob that will not be used (e.g. the file was removed before submitting)."""
+    if not _BLOB_ID_RE.fullmatch(blob_id):
+        raise HTTPException(status_code=400, detail=f"Unknown blob id: {blob_id}")
+    await asyncio.to_thread(shutil.rmtree, UPLOAD_BLOBS_PATH / blob_id, True)
+    return {"blob_id": blob_id, "deleted": True}
+
+def _release_blobs(paths: List[Path]):
+    # A job owns the blobs it was given; drop them once it no longer needs the files
+    for path in paths:
+        if path.parent.parent == UPLOAD_BLOBS_PATH:
+            shutil.rmtree(path.parent, ignore_errors=True)
+
+BLOB_SWEEP_INTERVAL = 3600  # seconds
+
+def _sweep_blobs():
+    cutoff = time.time() - UPLOAD_BLOB_TTL_SECONDS
+    try:
+        blob_dirs = list(os.scandir(UPLOAD_BLOBS_PATH))
+    except FileNotFoundError:
+        return
+    removed = 0
+    for entry in blob_dirs:
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    if removed:
+        logger.info(f"Swept {removed} unused upload blob(s)")
+
+async def _blob_sweeper():
+    # Blobs uploaded but never submitted (or submitted to a job that was not queued) expire here
+    while True:
+        await asyncio.to_thread(_sweep_blobs)
+        await asyncio.sleep(BLOB_SWEEP_INTERVAL)
+
+async def _resolve_blobs(blob_ids: List[str]) -> List[Path]:
+    def _resolve() -> List[Path]:
+        paths = []
+        for blob_id in blob_ids:
+            blob_dir = UPLOAD_BLOBS_PATH / blob_id
+            entries = list(blob_dir.iterdir()) if _BLOB_ID_RE.fullmatch(blob_id) and blob_dir.is_dir() else []
+            if len(entries) != 1:
+                raise HTTPException(status_code=400, detail=f"Unknown blob id: {blob_id}")
+            paths.append(entries[0])
+        return paths
+    return await asyncio.to_thread(_resolve)
+
+_UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+async def _ensure_dir(path: Path):
+    # Not memoised: an operator or cleanup may remove the directory at any time
+    await asyncio.to_thread(path.mkdir, parents=True, exist_ok=True)
+
+def _copy_spooled_to_disk(src, file_path: Path):
+    # The upload already lives in a real temp file: let the kernel copy it
+    src.flush()
+    in_fd = src.fileno()
+    size = os.fstat(in_fd).st_size
+    try:
+        with open(file_path, "wb") as out:
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(out.fileno(), in_fd, offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+    except OSError:
+        src.seek(0)
+        with open(file_path, "wb") as out:
+            shutil.copyfileobj(src, out, length=_UPLOAD_CHUNK_SIZE)
+
+def _has_fileno(src) -> bool:
+    try:
+        src.fileno()
+    except (io.UnsupportedOperation, AttributeError, OSError):
+        return False
+    return True
+
+async def _save_upload(file: UploadFile, file_path: Path):
+    # sendfile needs a real descriptor; anything without one is streamed instead
+    if hasattr(os, "sendfile") and _has_fileno(file.file):
+        await asyncio.to_thread(_copy_spooled_to_disk, file.file, file_path)
+        return
+
+    # Stream in bounded chunks so large uploads never sit fully in memory
+    # and the event loop is not blocked on disk writes
+    await file.seek(0)
+    async with aiofiles.open(file_path, "wb") as out:
+        while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+            await out.write(chunk)
+
 async def process_course_task(
     job_id: str, 
     course_ids: List[str],
@@ -257,20 +540,27 @@ async def process_course_task(
     topic_names: Optional[List[str]],
     blooms_distribution: Optional[Dict[str, int]],
     question_types: List[str],
-    time_limit: Optional[int]
+    time_limit: Optional[int],
+    force: bool = False
 ):
     try:
         await update_job_status(job_id, "IN_PROGRESS")
+        _set_progress(job_id, "FETCHING")
         
-        base_path = Path(INTERACTIVE_COURSES_PATH)
-        
-        # Fetch Data for ALL courses
-        for cid in course_ids:
-            success = await fetch_course_data(cid, base_path)
-            if not success:
+        # Fetch Data for ALL courses (concurrently, capped to spare the upstream API)
+        async def _fetch(cid: str):
+            async with _course_fetch_limit:
+                return await fetch_course_data(cid, INTERACTIVE_COURSES_PATH)
+
+        results = await asyncio.gather(*(_fetch(cid) for cid in course_ids), return_exceptions=True)
+        for cid, result in zip(course_ids, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Error fetching content for {cid}: {result}, proceeding with available data.")
+            elif not result:
                 logger.warning(f"Failed to fetch content for {cid}, proceeding with available data.")
 
         # 3. Generate Assessment
+        _set_progress(job_id, "GENERATING")
         metadata, assessment, usage = await generate_assessment(
             course_ids=course_ids,
             assessment_type=assessment_type, 
@@ -283,97 +573,238 @@ async def process_course_task(
             blooms_distribution=blooms_distribution,
             question_types=question_types,
             time_limit=time_limit,
-            extra_files=extra_files
+            extra_files=extra_files,
+            force=force
         )
         
         # 4. Save Result
+        _set_progress(job_id, "SAVING")
         await save_assessment_result(job_id, metadata, assessment, usage)
+
+        # 5. Pre-render the flat downloads once; the result is immutable from here on
+        try:
+            await asyncio.to_thread(write_csv_export, job_id, assessment)
+            await asyncio.to_thread(write_json_export, job_id, assessment)
+        except Exception as e:
+            logger.warning(f"Failed to pre-render exports for {job_id}: {e}")
+        _set_progress(job_id, "COMPLETED")
         
     except Exception as e:
         logger.exception(f"Job failed for {job_id}")
         await update_job_status(job_id, "FAILED", str(e))
+        _set_progress(job_id, "FAILED")
+    finally:
+        await asyncio.to_thread(_release_blobs, extra_files)
 
-@api_v1_router.get("/download_csv/{job_id}")
-async def download_csv(job_id: str):
-    data = await get_assessment_status(job_id)
-    if not data or data['status'] != 'COMPLETED':
-        raise HTTPException(status_code=404, detail="Assessment not ready or found")
-    
-    assessment_json = json.loads(data['assessment_data']) if isinstance(data['assessment_data'], str) else data['assessment_data']
-    
-    # Flatten logic for new structure
-    rows = []
+async def _job_worker(queue: asyncio.Queue):
+    while True:
+        job = await queue.get()
+        try:
+            await process_course_task(*job)
+        except Exception:
+            logger.exception(f"Worker crashed on job {job[0]}")
+        finally:
+            _live_jobs.discard(job[0])
+            queue.task_done()
+
+# Jobs queued or running in this process; their rows are heartbeated so that
+# claim_job's stale-job takeover only ever applies to jobs whose process is gone
+_live_jobs: set = set()
+
+async def _job_heartbeat():
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        if _live_jobs:
+            try:
+                await touch_jobs(list(_live_jobs))
+            except Exception as e:
+                logger.warning(f"Job heartbeat failed: {e}")
+
+EXPORT_FORMATS = ("csv", "json", "pdf", "docx")
+
+# Rendered (PDF/DOCX) exports carry RENDER_VERSION in their name; CSV/JSON do not
+RENDERED_FORMATS = ("pdf", "docx")
+
+def export_path(job_id: str, ext: str) -> Path:
+    if ext in RENDERED_FORMATS:
+        return INTERACTIVE_COURSES_PATH / f"{job_id}_assessment.{RENDER_VERSION}.{ext}"
+    return INTERACTIVE_COURSES_PATH / f"{job_id}_assessment.{ext}"
+
+def clear_exports(job_id: str):
+    """Removes previously rendered downloads so a regenerated job never serves stale files."""
+    for ext in EXPORT_FORMATS:
+        export_path(job_id, ext).unlink(missing_ok=True)
+    _drop_old_renders(job_id)
+
+def _drop_old_renders(job_id: str):
+    # Renders made by an earlier exporter/font version are never served again
+    for ext in RENDERED_FORMATS:
+        current = export_path(job_id, ext)
+        (INTERACTIVE_COURSES_PATH / f"{job_id}_assessment.{ext}").unlink(missing_ok=True)  # pre-versioning name
+        for path in INTERACTIVE_COURSES_PATH.glob(f"{job_id}_assessment.*.{ext}"):
+            if path != current:
+                path.unlink(missing_ok=True)
+
+CSV_EXPORT_COLUMNS = [
+    "Question ID", "Type", "Text", "Options/Pairs", "Correct Answer",
+    "Blooms Level", "Difficulty", "Relevance %"
+]
+
+def _csv_correct_answer(q: dict):
+    idx = q.get("correct_option_index")
+    if isinstance(idx, list):
+        return ",".join(map(str, idx))
+    return idx if idx is not None else q.get("correct_answer")
+
+def write_csv_export(job_id: str, assessment_json: dict) -> Path:
+    # Fixed schema, so rows are plain tuples streamed straight to csv.writer
     questions_obj = assessment_json.get("questions", {})
+    rows = (
+        (
+            q.get("question_id"),
+            q_type,
+            q.get("question_text", "N/A"),
+            orjson.dumps(q.get("options") or q.get("pairs") or "").decode(),
+            _csv_correct_answer(q),
+            q.get("blooms_level"),
+            q.get("difficulty_level"),
+            q.get("relevance_percentage"),
+        )
+        for q_type, q_list in questions_obj.items()
+        for q in q_list
+    )
+
+    csv_path = export_path(job_id, "csv")
+    tmp_path = _export_tmp_path(csv_path)
+    try:
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_EXPORT_COLUMNS)
+            writer.writerows(rows)
+        os.replace(tmp_path, csv_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return csv_path
+
+def write_json_export(job_id: str, assessment_json: dict) -> Path:
+    json_path = export_path(job_id, "json")
+    tmp_path = _export_tmp_path(json_path)
+    try:
+        tmp_path.write_bytes(orjson.dumps(assessment_json, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_path, json_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return json_path
+
+def _export_tmp_path(path: Path) -> Path:
+    # Exports are written beside their final path and swapped in with os.replace, so a
+    # download never sees a half-written file; unique per writer, as the post-completion
+    # render and a background rebuild may run at once
+    return path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+
+# Parsed assessment payloads for the download endpoints, as job_id -> (updated_at, data).
+# A regenerated job has a newer updated_at, so the stale entry is refetched.
+_assessment_cache: TTLCache = TTLCache(maxsize=128, ttl=300)
+_assessment_cache_lock = asyncio.Lock()
+
+async def _load_assessment(job_id: str) -> dict:
+    async with _assessment_cache_lock:
+        cached = _assessment_cache.get(job_id)
+
+    # Single round-trip: status check, and the blob only if our copy is stale
+    row = await get_completed_assessment(job_id, cached[0] if cached else None)
+    if not row:
+        raise HTTPException(status_code=404, detail="Assessment not ready or found")
+    if cached and cached[0] == row['updated_at']:
+        return cached[1]
+
+    assessment_json = row['assessment_data']
+    if not isinstance(assessment_json, dict):
+        # The JSONB codec decodes to dict; only a text-typed write would land here
+        logger.warning(f"assessment_data for {job_id} is {type(assessment_json).__name__}, re-parsing")
+        assessment_json = orjson.loads(assessment_json)
+    async with _assessment_cache_lock:
+        _assessment_cache[job_id] = (row['updated_at'], assessment_json)
+    return assessment_json
+
+@api_v1_router.get("/download_csv/{job_id}")
+async def download_csv(job_id: str, background_tasks: BackgroundTasks):
+    assessment_json = await _load_assessment(job_id)
     
-    for q_type, q_list in questions_obj.items():
-        for q in q_list:
-            row = {
-                "Question ID": q.get("question_id"),
-                "Type": q_type,
-                "Text": q.get("question_text", "N/A"),
-                "Options/Pairs": json.dumps(q.get("options") or q.get("pairs") or "", ensure_ascii=False),
-                "Correct Answer": (
-                    ",".join(map(str, q.get("correct_option_index"))) if isinstance(q.get("correct_option_index"), list)
-                    else q.get("correct_option_index") if q.get("correct_option_index") is not None 
-                    else q.get("correct_answer")
-                ),
-                "Blooms Level": q.get("blooms_level"),
-                "Difficulty": q.get("difficulty_level"),
-                "Relevance %": q.get("relevance_percentage")
-            }
-            rows.append(row)
-        
-    df = pd.DataFrame(rows)
-    csv_path = Path(INTERACTIVE_COURSES_PATH) / f"{job_id}_assessment.csv"
-    df.to_csv(csv_path, index=False)
-    
-    return FileResponse(csv_path, filename=f"{job_id}_assessment.csv")
+    csv_path = export_path(job_id, "csv")
+    if csv_path.exists():
+        return FileResponse(csv_path, filename=f"{job_id}_assessment.csv")
+
+    # Normally rendered on completion; rebuild off the request path if it went missing
+    background_tasks.add_task(write_csv_export, job_id, assessment_json)
+    return JSONResponse(
+        status_code=202,
+        content={"message": "CSV export is being prepared, retry shortly", "status": "REGENERATING", "job_id": job_id}
+    )
 
 @api_v1_router.get("/download_json/{job_id}")
 async def download_json(job_id: str):
-    data = await get_assessment_status(job_id)
-    if not data or data['status'] != 'COMPLETED':
-        raise HTTPException(status_code=404, detail="Assessment not ready or found")
-    
-    assessment_json = json.loads(data['assessment_data']) if isinstance(data['assessment_data'], str) else data['assessment_data']
+    assessment_json = await _load_assessment(job_id)
     
-    json_path = Path(INTERACTIVE_COURSES_PATH) / f"{job_id}_assessment.json"
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(assessment_json, f, indent=2, ensure_ascii=False)
+    json_path = export_path(job_id, "json")
+    if not json_path.exists():
+        await asyncio.to_thread(write_json_export, job_id, assessment_json)
         
     return FileResponse(json_path, filename=f"{job_id}_assessment.json", media_type='application/json')
 
+PDF_MEDIA_TYPE = 'application/pdf'
+DOCX_MEDIA_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+async def _persist_export(path: Path, content: bytes):
+    # Write to a sibling temp file and swap it in, so a concurrent
+    # FileResponse never serves a half-written document
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            await out.write(content)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Failed to cache export {path}: {e}")
+
+async def _render_export(job_id: str, ext: str, render, media_type: str, background_tasks: BackgroundTasks):
+    assessment_json = await _load_assessment(job_id)
+
+    filename = f"{job_id}_assessment.{ext}"
+    path = export_path(job_id, ext)
+    if path.exists():
+        return FileResponse(path, filename=filename, media_type=media_type)
+
+    buf = io.BytesIO()
+    await asyncio.to_thread(render, assessment_json, buf)
+    content = buf.getvalue()
+
+    # Respond straight from memory; the on-disk copy is only for later requests
+    background_tasks.add_task(_persist_export, path, content)
+    background_tasks.add_task(asyncio.to_thread, _drop_old_renders, job_id)
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @api_v1_router.get("/download_pdf/{job_id}")
-async def download_pdf(job_id: str):
-    data = await get_assessment_status(job_id)
-    if not data or data['status'] != 'COMPLETED':
-        raise HTTPException(status_code=404, detail="Assessment not ready or found")
-    
-    assessment_json = json.loads(data['assessment_data']) if isinstance(data['assessment_data'], str) else data['assessment_data']
-    pdf_path = Path(INTERACTIVE_COURSES_PATH) / f"{job_id}_assessment.pdf"
-    
-    # Remove caching check to ensure font fixes are applied
-    # if not pdf_path.exists():
-    generate_pdf(assessment_json, pdf_path)
-        
-    return FileResponse(pdf_path, filename=f"{job_id}_assessment.pdf", media_type='application/pdf')
+async def download_pdf(job_id: str, background_tasks: BackgroundTasks):
+    return await _render_export(job_id, "pdf", generate_pdf, PDF_MEDIA_TYPE, background_tasks)
 
 @api_v1_router.get("/download_docx/{job_id}")
-async def download_docx(job_id: str):
-    data = await get_assessment_status(job_id)
-    if not data or data['status'] != 'COMPLETED':
-        raise HTTPException(status_code=404, detail="Assessment not ready or found")
-    
-    assessment_json = json.loads(data['assessment_data']) if isinstance(data['assessment_data'], str) else data['assessment_data']
-    docx_path = Path(INTERACTIVE_COURSES_PATH) / f"{job_id}_assessment.docx"
-    
-    if not docx_path.exists():
-        generate_docx(assessment_json, docx_path)
-        
-    return FileResponse(docx_path, filename=f"{job_id}_assessment.docx", media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+async def download_docx(job_id: str, background_tasks: BackgroundTasks):
+    return await _render_export(job_id, "docx", generate_docx, DOCX_MEDIA_TYPE, background_tasks)
 
 app.include_router(api_v1_router)
 
+GENERATE_PATH = f"{api_v1_router.prefix}/generate"
+FILES_SCHEMA_OVERRIDE = {
+    "type": "array",
+    "items": {"type": "string", "format": "binary"},
+    "title": "Files",
+    "description": "Upload Files"
+}
+
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
@@ -388,30 +819,17 @@ def custom_openapi():
     # WORKAROUND: Force 'files' to be binary array in Docs
     # ----------------------------------------------------
     try:
-        paths = openapi_schema.get("paths", {})
-        for path, methods in paths.items():
-            if path.endswith("/generate"):
-                post = methods.get("post", {})
-                content = post.get("requestBody", {},).get("content", {})
-                multipart = content.get("multipart/form-data", {})
-                schema = multipart.get("schema", {})
-                
-                # Check if schema is a reference
-                if "$ref" in schema:
-                    ref_name = schema["$ref"].split("/")[-1]
-                    schema = openapi_schema.get("components", {}).get("schemas", {}).get(ref_name, {})
-                
-                properties = schema.get("properties", {})
-                
-                # Force File Picker Override
-                properties["files"] = {
-                    "type": "array",
-                    "items": {"type": "string", "format": "binary"},
-                    "title": "Files",
-                    "description": "Upload Files"
-                }
-                logger.info(f"Forced 'files' schema override for path: {path}")
-    except Exception as e:
+        schema = openapi_schema["paths"][GENERATE_PATH]["post"]["requestBody"]["content"]["multipart/form-data"]["schema"]
+
+        # Check if schema is a reference
+        if "$ref" in schema:
+            ref_name = schema["$ref"].rsplit("/", 1)[-1]
+            schema = openapi_schema["components"]["schemas"][ref_name]
+
+        # Force File Picker Override
+        schema["properties"]["files"] = FILES_SCHEMA_OVERRIDE
+        logger.info(f"Forced 'files' schema override for path: {GENERATE_PATH}")
+    except (KeyError, TypeError) as e:
         logger.warning(f"Failed to patch OpenAPI schema: {e}")
 
     app.openapi_schema = openapi_schema
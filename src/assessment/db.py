@@ -1,12 +1,15 @@
+import asyncio
 import asyncpg
-import json
+import orjson
 import logging
 from datetime import datetime
-from typing import Optional, Dict, Any
-from .config import DB_DSN
+from typing import Optional, Dict, Any, List, Tuple
+from .config import DB_DSN, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_COMMAND_TIMEOUT, JOB_STALE_SECONDS
 
 logger = logging.getLogger(__name__)
 
+POOL_MAX_INACTIVE_LIFETIME = 300  # seconds
+
 CREATE_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS interactive_assessments (
     course_id TEXT PRIMARY KEY,
@@ -20,49 +23,148 @@ CREATE TABLE IF NOT EXISTS interactive_assessments (
 );
 """
 
+# Binary JSONB wire format is a one-byte version header followed by the JSON text
+_JSONB_VERSION = b'\x01'
+
+def _encode_jsonb(value: Any) -> bytes:
+    return _JSONB_VERSION + orjson.dumps(value)
+
+def _decode_jsonb(data: bytes) -> Any:
+    return orjson.loads(memoryview(data)[1:])
+
+# JSONB columns are decoded to Python objects on read and encoded on write,
+# so callers never handle the raw JSON text.
+async def _init_connection(conn: asyncpg.Connection):
+    await conn.set_type_codec(
+        'jsonb', encoder=_encode_jsonb, decoder=_decode_jsonb,
+        schema='pg_catalog', format='binary'
+    )
+
+# One pool per process, shared by every request and background job
+_pool: Optional[asyncpg.Pool] = None
+_pool_lock = asyncio.Lock()
+
+async def _get_pool() -> asyncpg.Pool:
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await asyncpg.create_pool(
+                    DB_DSN,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    command_timeout=DB_COMMAND_TIMEOUT,
+                    max_inactive_connection_lifetime=POOL_MAX_INACTIVE_LIFETIME,
+                    init=_init_connection
+                )
+    return _pool
+
+# lz4 TOAST compression (PostgreSQL 14+) for the large JSONB payloads; much
+# cheaper to compress/decompress than the default pglz. Applies to new writes.
+SET_COMPRESSION_SQL = """
+ALTER TABLE interactive_assessments
+    ALTER COLUMN metadata SET COMPRESSION lz4,
+    ALTER COLUMN assessment_data SET COMPRESSION lz4,
+    ALTER COLUMN token_usage SET COMPRESSION lz4;
+"""
+
 async def init_db():
-    conn = await asyncpg.connect(DB_DSN)
-    try:
+    pool = await _get_pool()
+    async with pool.acquire() as conn:
         await conn.execute(CREATE_TABLE_SQL)
-    finally:
-        await conn.close()
+        try:
+            await conn.execute(SET_COMPRESSION_SQL)
+        except asyncpg.PostgresError as e:
+            logger.warning(f"lz4 column compression unavailable, keeping default: {e}")
 
-async def get_assessment_status(course_id: str) -> Optional[Dict[str, Any]]:
-    conn = await asyncpg.connect(DB_DSN)
-    try:
+async def close_db():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+async def get_job_status_light(course_id: str) -> Optional[Dict[str, Any]]:
+    # Status-only projection for polling and dedup checks; skips the JSONB blobs
+    pool = await _get_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            "SELECT course_id, status, error_message, updated_at FROM interactive_assessments WHERE course_id = $1",
+            course_id
+        )
+        if row:
+            return dict(row)
+        return None
+
+async def get_assessment_full(course_id: str) -> Optional[Dict[str, Any]]:
+    pool = await _get_pool()
+    async with pool.acquire() as conn:
         row = await conn.fetchrow("SELECT * FROM interactive_assessments WHERE course_id = $1", course_id)
         if row:
             return dict(row)
         return None
-    finally:
-        await conn.close()
 
-async def create_job(course_id: str):
-    conn = await asyncpg.connect(DB_DSN)
-    try:
+# Heartbeat for jobs this process still holds (queued or running), so claim_job
+# never mistakes a live job for a lost one
+async def touch_jobs(course_ids: List[str]):
+    pool = await _get_pool()
+    async with pool.acquire() as conn:
         await conn.execute("""
+            UPDATE interactive_assessments
+            SET updated_at = NOW()
+            WHERE course_id = ANY($1::text[]) AND status IN ('PENDING', 'IN_PROGRESS')
+        """, course_ids)
+
+# One round-trip for the download path: returns None unless the job is COMPLETED.
+# assessment_data is only shipped when it differs from the caller's cached version.
+async def get_completed_assessment(course_id: str, known_updated_at: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    pool = await _get_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow("""
+            SELECT updated_at,
+                   CASE WHEN updated_at IS DISTINCT FROM $2 THEN assessment_data END AS assessment_data
+            FROM interactive_assessments
+            WHERE course_id = $1 AND status = 'COMPLETED'
+        """, course_id, known_updated_at)
+        if row:
+            return dict(row)
+        return None
+
+# Atomically creates or resets a job to PENDING unless it is already queued or
+# running (and heartbeated within JOB_STALE_SECONDS), or (without force) completed.
+# Returns (claimed, current status).
+async def claim_job(course_id: str, force: bool = False) -> Tuple[bool, str]:
+    pool = await _get_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow("""
             INSERT INTO interactive_assessments (course_id, status, updated_at)
             VALUES ($1, 'PENDING', NOW())
             ON CONFLICT (course_id) DO UPDATE
             SET status = 'PENDING', updated_at = NOW(), error_message = NULL
-        """, course_id)
-    finally:
-        await conn.close()
+            WHERE (interactive_assessments.status NOT IN ('PENDING', 'IN_PROGRESS')
+                   OR interactive_assessments.updated_at < NOW() - make_interval(secs => $3))
+              AND (interactive_assessments.status <> 'COMPLETED' OR $2)
+            RETURNING status
+        """, course_id, force, float(JOB_STALE_SECONDS))
+        if row:
+            return True, row['status']
+        # Conflict left the row untouched; report what is already there
+        status = await conn.fetchval(
+            "SELECT status FROM interactive_assessments WHERE course_id = $1", course_id
+        )
+        return False, status
 
 async def update_job_status(course_id: str, status: str, error: str = None):
-    conn = await asyncpg.connect(DB_DSN)
-    try:
+    pool = await _get_pool()
+    async with pool.acquire() as conn:
         await conn.execute("""
             UPDATE interactive_assessments
             SET status = $2, error_message = $3, updated_at = NOW()
             WHERE course_id = $1
         """, course_id, status, error)
-    finally:
-        await conn.close()
 
 async def save_assessment_result(course_id: str, metadata: dict, assessment: dict, usage: dict):
-    conn = await asyncpg.connect(DB_DSN)
-    try:
+    pool = await _get_pool()
+    async with pool.acquire() as conn:
         await conn.execute("""
             UPDATE interactive_assessments
             SET status = 'COMPLETED', 
@@ -71,6 +173,4 @@ async def save_assessment_result(course_id: str, metadata: dict, assessment: dic
                 token_usage = $4, 
                 updated_at = NOW()
             WHERE course_id = $1
-        """, course_id, json.dumps(metadata), json.dumps(assessment), json.dumps(usage))
-    finally:
-        await conn.close()
+        """, course_id, metadata, assessment, usage)
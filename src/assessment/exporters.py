@@ -1,74 +1,102 @@
-import json
+import functools
+import hashlib
 import logging
-import os
+import orjson
 from pathlib import Path
+from xml.sax.saxutils import escape
+from typing import BinaryIO, Optional, Union
 from docx import Document
-from docx.shared import Pt, Inches
+
+from .config import PDF_COMPLEX_LAYOUT
 
 # WeasyPrint Import
 from weasyprint import HTML, CSS
 from weasyprint.text.fonts import FontConfiguration
 
+# ReportLab is optional; without it every PDF goes through WeasyPrint
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer, KeepTogether
+except ImportError:
+    SimpleDocTemplate = None
+
 logger = logging.getLogger(__name__)
 
 # Suppress noisy logs from pdf generation libraries
 # WeasyPrint and FontTools can be very verbose, especially during font subsetting
 # The user specifically requested only error logs.
-for logger_name in ["weasyprint", "fontTools", "fontTools.subset", "fontTools.ttLib", "pydyf"]:
+for logger_name in ["weasyprint", "fontTools", "fontTools.subset", "fontTools.ttLib", "pydyf", "reportlab"]:
     logging.getLogger(logger_name).setLevel(logging.ERROR)
 
 RESOURCE_DIR = Path(__file__).parent / "resources" / "fonts"
 
-def get_css_font_faces() -> str:
-    """Generates CSS @font-face rules for all available Noto fonts."""
-    font_map = {
-        "NotoSansDevanagari-Regular.ttf": "NotoSansDevanagari",
-        "NotoSansTamil-Regular.ttf": "NotoSansTamil",
-        "NotoSansTelugu-Regular.ttf": "NotoSansTelugu",
-        "NotoSansKannada-Regular.ttf": "NotoSansKannada",
-        "NotoSansMalayalam-Regular.ttf": "NotoSansMalayalam",
-        "NotoSansBengali-Regular.ttf": "NotoSansBengali",
-        "NotoSansGujarati-Regular.ttf": "NotoSansGujarati",
-        "NotoSansGurmukhi-Regular.ttf": "NotoSansGurmukhi"
-    }
-    
+# Noto font per Indic script, in Pango fallback order. Each script occupies one
+# 128-codepoint Unicode block, so a character's block is simply ord(ch) >> 7.
+FONT_SCRIPTS = [
+    ("NotoSansMalayalam-Regular.ttf", "NotoSansMalayalam", 0x0D00),
+    ("NotoSansDevanagari-Regular.ttf", "NotoSansDevanagari", 0x0900),
+    ("NotoSansTamil-Regular.ttf", "NotoSansTamil", 0x0B80),
+    ("NotoSansTelugu-Regular.ttf", "NotoSansTelugu", 0x0C00),
+    ("NotoSansKannada-Regular.ttf", "NotoSansKannada", 0x0C80),
+    ("NotoSansBengali-Regular.ttf", "NotoSansBengali", 0x0980),
+    ("NotoSansGujarati-Regular.ttf", "NotoSansGujarati", 0x0A80),
+    ("NotoSansGurmukhi-Regular.ttf", "NotoSansGurmukhi", 0x0A00),
+]
+INDIC_SHAPING_RANGES = "U+200C-200D, U+25CC"
+_SCRIPT_BLOCKS = frozenset(start >> 7 for _, _, start in FONT_SCRIPTS)
+
+def detect_script_blocks(text: str) -> frozenset:
+    """Returns the Indic script blocks (ord >> 7) that occur in the text."""
+    if text.isascii():
+        return frozenset()
+    return frozenset(ord(ch) >> 7 for ch in set(text)) & _SCRIPT_BLOCKS
+
+@functools.lru_cache(maxsize=32)
+def get_css_font_faces(blocks: frozenset) -> str:
+    """Generates @font-face rules and the body font stack for the scripts in use."""
     css = []
-    for filename, font_family in font_map.items():
+    families = []
+    for filename, font_family, start in FONT_SCRIPTS:
+        if start >> 7 not in blocks:
+            continue
         font_path = RESOURCE_DIR / filename
         if font_path.exists():
-            # WeasyPrint needs file:// URI for local files or absolute paths
+            # WeasyPrint needs file:// URI for local files or absolute paths;
+            # unicode-range lets font matching skip the face for other text.
+            # ZWNJ/ZWJ and the dotted circle must stay in the script's face or they
+            # fall back to another font and break the shaping run (chillus, half-forms).
             css.append(f"""
             @font-face {{
                 font-family: '{font_family}';
                 src: url('file://{font_path.absolute()}');
+                unicode-range: U+{start:04X}-{start + 0x7F:04X}, {INDIC_SHAPING_RANGES};
             }}""")
-            
-    return "\n".join(css)
+            families.append(f"'{font_family}'")
 
-def generate_html_content(assessment_data: dict) -> str:
-    """Constructs the HTML report string."""
-    blueprint = assessment_data.get("blueprint", {})
-    questions_obj = assessment_data.get("questions", {})
-    
-    # Audit Data
-    prompt_ver = blueprint.get("prompt_version", "N/A")
-    api_ver = blueprint.get("api_version", "N/A")
-    scope = blueprint.get('assessment_scope_summary', 'N/A')
-    
-    # CSS
-    font_faces = get_css_font_faces()
     # Pango Stack: Put specific fonts first, then sans-serif fallback
-    font_stack = "'NotoSansMalayalam', 'NotoSansDevanagari', 'NotoSansTamil', 'NotoSansTelugu', 'NotoSansKannada', 'NotoSansBengali', 'NotoSansGujarati', 'NotoSansGurmukhi', sans-serif"
-
-    html_parts = ["""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <style>
-            %s
+    families.append("sans-serif")
+    css.append(f"            body {{ font-family: {', '.join(families)}; }}")
+    return "\n".join(css)
+
+def _render_version() -> str:
+    # Fingerprint of everything that shapes a rendered PDF/DOCX: this module's code,
+    # the bundled fonts, the layout switch and whether the ReportLab fast path exists
+    h = hashlib.blake2b(Path(__file__).read_bytes(), digest_size=6)
+    for font in sorted(RESOURCE_DIR.glob("*.ttf")):
+        st = font.stat()
+        h.update(f"{font.name}:{st.st_size}:{st.st_mtime_ns}".encode())
+    h.update(f"{PDF_COMPLEX_LAYOUT}:{SimpleDocTemplate is not None}".encode())
+    return h.hexdigest()
+
+# Part of cached PDF/DOCX file names, so exporter or font changes never serve an old render
+RENDER_VERSION = _render_version()
+
+# Static report stylesheet, built once at import instead of on every render
+# Report CSS split by feature so WeasyPrint only parses rules the page uses
+REPORT_CSS = """
             body {
-                font-family: %s;
                 font-size: 11pt;
                 line-height: 1.5;
                 color: #333;
@@ -77,103 +105,258 @@ def generate_html_content(assessment_data: dict) -> str:
             h1 { font-size: 24pt; color: #2c3e50; border-bottom: 2px solid #eee; padding-bottom: 10px; }
             h2 { font-size: 18pt; color: #34495e; margin-top: 30px; }
             h3 { font-size: 14pt; color: #7f8c8d; }
-            .audit-table { width: 100%%; border-collapse: collapse; margin-bottom: 20px; }
+"""
+AUDIT_CSS = """
+            .audit-table { width: 100%; border-collapse: collapse; margin-bottom: 20px; }
             .audit-table th, .audit-table td { border: 1px solid #ddd; padding: 8px; text-align: left; }
             .audit-table th { background-color: #f2f2f2; }
+"""
+QUESTION_CSS = """
             .question-block { margin-bottom: 25px; page-break-inside: avoid; }
             .question-text { font-weight: bold; font-size: 12pt; margin-bottom: 8px; }
             .options-list { list-style-type: none; padding-left: 20px; }
             .options-list li { margin-bottom: 4px; }
             .reasoning-box { background-color: #f8f9fa; border-left: 4px solid #3498db; padding: 10px; margin-top: 10px; font-size: 10pt; }
             .correct { color: #27ae60; font-weight: bold; }
-        </style>
-    </head>
-    <body>
-        <h1>Course Assessment Report</h1>
-        
-        <p><b>Assessment Scope:</b> %s</p>
-        
-        <h3>Audit Information</h3>
-        <table class="audit-table">
-            <tr><th>Field</th><th>Value</th></tr>
-            <tr><td>Prompt Version</td><td>%s</td></tr>
-            <tr><td>API Version</td><td>%s</td></tr>
-        </table>
-        
-        <h2>Questions & Reasoning</h2>
-    """ % (font_faces, font_stack, scope, prompt_ver, api_ver)]
+"""
+
+def generate_html_content(assessment_data: dict) -> str:
+    """Constructs the HTML report string."""
+    blueprint = assessment_data.get("blueprint", {})
+    questions_obj = assessment_data.get("questions", {})
+    
+    # Audit Data
+    prompt_ver = blueprint.get("prompt_version", "N/A")
+    api_ver = blueprint.get("api_version", "N/A")
+    scope = blueprint.get('assessment_scope_summary', 'N/A')
+    
+    html_parts = []
+    add = html_parts.append
+    add("<h1>Course Assessment Report</h1>")
+    add(f"<p><b>Assessment Scope:</b> {scope}</p>")
+    add("<h3>Audit Information</h3>")
+    add('<table class="audit-table">')
+    add("<tr><th>Field</th><th>Value</th></tr>")
+    add(f"<tr><td>Prompt Version</td><td>{prompt_ver}</td></tr>")
+    add(f"<tr><td>API Version</td><td>{api_ver}</td></tr>")
+    add("</table>")
+    add("<h2>Questions & Reasoning</h2>")
 
     # Dynamic Questions
     q_counter = 1
     for q_type, q_list in questions_obj.items():
-        html_parts.append(f"<h3>{q_type} ({len(q_list)})</h3>")
+        add(f"<h3>{q_type} ({len(q_list)})</h3>")
         
         for q in q_list:
-            q_txt = q.get("question_text", "N/A")
-            q_html = f"""
-            <div class="question-block">
-                <div class="question-text">Q{q_counter}: {q_txt}</div>
-            """
+            add('<div class="question-block">')
+            add(f'<div class="question-text">Q{q_counter}: {q.get("question_text", "N/A")}</div>')
             
             # Options / Body
             if q_type == "Multiple Choice Question":
-                opts_html = "".join([f"<li>- {o.get('text', '')}</li>" for o in q.get("options", [])])
-                idx = q.get('correct_option_index')
-                q_html += f"<ul class='options-list'>{opts_html}</ul>"
-                q_html += f"<div class='correct'>Correct Answer: Option {idx}</div>"
+                add("<ul class='options-list'>")
+                html_parts.extend(f"<li>- {o.get('text', '')}</li>" for o in q.get("options", []))
+                add("</ul>")
+                add(f"<div class='correct'>Correct Answer: Option {q.get('correct_option_index')}</div>")
             
             elif q_type == "MTF Question":
-                pairs_html = "".join([f"<li>- {p.get('left')} &rarr; {p.get('right')}</li>" for p in q.get("pairs", [])])
-                q_html += f"<ul class='options-list'>{pairs_html}</ul>"
+                add("<ul class='options-list'>")
+                html_parts.extend(f"<li>- {p.get('left')} &rarr; {p.get('right')}</li>" for p in q.get("pairs", []))
+                add("</ul>")
             
             elif q_type == "Multi-Choice Question":
-                opts_html = "".join([f"<li>[ ] {o.get('text', '')}</li>" for o in q.get("options", [])])
+                add("<ul class='options-list'>")
+                html_parts.extend(f"<li>[ ] {o.get('text', '')}</li>" for o in q.get("options", []))
+                add("</ul>")
                 corr = q.get('correct_option_index')
                 corr_str = ", ".join(map(str, corr)) if isinstance(corr, list) else str(corr)
-                q_html += f"<ul class='options-list'>{opts_html}</ul>"
-                q_html += f"<div class='correct'>Correct Options: {corr_str}</div>"
+                add(f"<div class='correct'>Correct Options: {corr_str}</div>")
             
             elif q_type == "True/False Question":
-                q_html += "<ul class='options-list'><li>- True</li><li>- False</li></ul>"
-                q_html += f"<div class='correct'>Correct Answer: {q.get('correct_answer')}</div>"
+                add("<ul class='options-list'><li>- True</li><li>- False</li></ul>")
+                add(f"<div class='correct'>Correct Answer: {q.get('correct_answer')}</div>")
             
             else:
-                q_html += f"<div class='correct'>Answer: {q.get('correct_answer')}</div>"
+                add(f"<div class='correct'>Answer: {q.get('correct_answer')}</div>")
 
             # Reasoning Box
             rs = q.get("reasoning", {})
             kcm = rs.get("competency_alignment", {}).get("kcm", {})
             
-            q_html += f"""
-                <div class="reasoning-box">
-                    <b>Rationale:</b> {rs.get('question_type_rationale')}<br/>
-                    <b>Bloom's Level:</b> {q.get('blooms_level')} ({rs.get('blooms_level_justification')})<br/>
-                    <b>Competency:</b> {kcm.get('competency_area')} - {kcm.get('competency_theme')}<br/>
-                    <b>Relevance:</b> {q.get('relevance_percentage')}%
-                </div>
-            </div>
-            """
-            html_parts.append(q_html)
+            add('<div class="reasoning-box">')
+            add(f"<b>Rationale:</b> {rs.get('question_type_rationale')}<br/>")
+            add(f"<b>Bloom's Level:</b> {q.get('blooms_level')} ({rs.get('blooms_level_justification')})<br/>")
+            add(f"<b>Competency:</b> {kcm.get('competency_area')} - {kcm.get('competency_theme')}<br/>")
+            add(f"<b>Relevance:</b> {q.get('relevance_percentage')}%")
+            add("</div>\n</div>")
             q_counter += 1
 
-    html_parts.append("</body></html>")
-    return "\n".join(html_parts)
+    body = "\n".join(html_parts)
+
+    # Only ship the fonts and rules for what actually occurs in the report
+    font_faces = get_css_font_faces(detect_script_blocks(body))
+    # The audit table is always rendered (as in the ReportLab and DOCX reports)
+    css = REPORT_CSS + AUDIT_CSS
+    if q_counter > 1:
+        css += QUESTION_CSS
+    return (
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n'
+        f"<style>\n{font_faces}\n{css}\n</style>\n"
+        f"</head>\n<body>\n{body}\n</body></html>"
+    )
+
+def _as_target(output: Union[Path, str, BinaryIO]):
+    return str(output) if isinstance(output, (str, Path)) else output
+
+# ---------------------------------------------------------------------------
+# ReportLab fast path: the report is plain headings, a table and paragraphs,
+# so when every character is covered by the built-in Helvetica (cp1252) we can
+# skip WeasyPrint's HTML/CSS layout engine entirely.
+# ---------------------------------------------------------------------------
+if SimpleDocTemplate is not None:
+    _RL_BASE = getSampleStyleSheet()
+    _RL_STYLES = {
+        "h1": ParagraphStyle("ReportH1", parent=_RL_BASE["Heading1"], fontSize=24, leading=30, textColor=colors.HexColor("#2c3e50")),
+        "h2": ParagraphStyle("ReportH2", parent=_RL_BASE["Heading2"], fontSize=18, leading=24, spaceBefore=30, textColor=colors.HexColor("#34495e")),
+        "h3": ParagraphStyle("ReportH3", parent=_RL_BASE["Heading3"], fontSize=14, leading=18, textColor=colors.HexColor("#7f8c8d")),
+        "body": ParagraphStyle("ReportBody", parent=_RL_BASE["Normal"], fontSize=11, leading=16.5, textColor=colors.HexColor("#333333")),
+        "question": ParagraphStyle("ReportQuestion", parent=_RL_BASE["Normal"], fontName="Helvetica-Bold", fontSize=12, leading=18, spaceAfter=8),
+        "options": ParagraphStyle("ReportOptions", parent=_RL_BASE["Normal"], fontSize=11, leading=16.5, leftIndent=20),
+        "correct": ParagraphStyle("ReportCorrect", parent=_RL_BASE["Normal"], fontName="Helvetica-Bold", fontSize=11, leading=16.5, textColor=colors.HexColor("#27ae60")),
+        "reasoning": ParagraphStyle("ReportReasoning", parent=_RL_BASE["Normal"], fontSize=10, leading=15),
+    }
+    _RL_AUDIT_TABLE_STYLE = TableStyle([
+        ("GRID", (0, 0), (-1, -1), 1, colors.HexColor("#dddddd")),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f2f2f2")),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("PADDING", (0, 0), (-1, -1), 8),
+    ])
+    _RL_REASONING_BOX_STYLE = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#f8f9fa")),
+        ("LINEBEFORE", (0, 0), (0, -1), 4, colors.HexColor("#3498db")),
+        ("PADDING", (0, 0), (-1, -1), 10),
+    ])
+
+_RL_MARGIN = 40
+_RL_FRAME_WIDTH = 595.27 - 2 * _RL_MARGIN  # A4 width in points
+
+def can_use_fast_pdf(assessment_data: dict) -> bool:
+    """True when ReportLab is installed and all report text fits Helvetica's cp1252 charset."""
+    if SimpleDocTemplate is None:
+        return False
+    text = orjson.dumps(assessment_data).decode()
+    if text.isascii():
+        return True
+    try:
+        text.encode("cp1252")
+        return True
+    except UnicodeEncodeError:
+        return False
+
+def _choice_lines(q_type: str, q: dict):
+    """Option/pair lines and the answer line for one question, as plain text."""
+    if q_type == "Multiple Choice Question":
+        return [f"- {o.get('text', '')}" for o in q.get("options", [])], f"Correct Answer: Option {q.get('correct_option_index')}"
+    if q_type == "MTF Question":
+        return [f"- {p.get('left')} -> {p.get('right')}" for p in q.get("pairs", [])], None  # no arrow glyph in cp1252 Helvetica
+    if q_type == "Multi-Choice Question":
+        corr = q.get('correct_option_index')
+        corr_str = ", ".join(map(str, corr)) if isinstance(corr, list) else str(corr)
+        return [f"[ ] {o.get('text', '')}" for o in q.get("options", [])], f"Correct Options: {corr_str}"
+    if q_type == "True/False Question":
+        return ["- True", "- False"], f"Correct Answer: {q.get('correct_answer')}"
+    return [], f"Answer: {q.get('correct_answer')}"
+
+def generate_pdf_fast(assessment_data: dict, output: Union[Path, str, BinaryIO]):
+    """Generates the PDF report directly with ReportLab platypus (Latin-script content only)."""
+    st = _RL_STYLES
+    blueprint = assessment_data.get("blueprint", {})
+    questions_obj = assessment_data.get("questions", {})
+
+    story = [
+        Paragraph("Course Assessment Report", st["h1"]),
+        Paragraph(f"<b>Assessment Scope:</b> {escape(str(blueprint.get('assessment_scope_summary', 'N/A')))}", st["body"]),
+        Paragraph("Audit Information", st["h3"]),
+        Table(
+            [
+                ["Field", "Value"],
+                ["Prompt Version", Paragraph(escape(str(blueprint.get("prompt_version", "N/A"))), st["body"])],
+                ["API Version", Paragraph(escape(str(blueprint.get("api_version", "N/A"))), st["body"])],
+            ],
+            colWidths=[_RL_FRAME_WIDTH * 0.3, _RL_FRAME_WIDTH * 0.7],
+            style=_RL_AUDIT_TABLE_STYLE,
+        ),
+        Paragraph("Questions &amp; Reasoning", st["h2"]),
+    ]
+
+    q_counter = 1
+    for q_type, q_list in questions_obj.items():
+        story.append(Paragraph(escape(f"{q_type} ({len(q_list)})"), st["h3"]))
+
+        for q in q_list:
+            block = [Paragraph(escape(f"Q{q_counter}: {q.get('question_text', 'N/A')}"), st["question"])]
+            lines, answer = _choice_lines(q_type, q)
+            if lines:
+                # One flowable per question for all options instead of one per line
+                block.append(Paragraph("<br/>".join(map(escape, lines)), st["options"]))
+            if answer:
+                block.append(Paragraph(escape(answer), st["correct"]))
+
+            rs = q.get("reasoning", {})
+            kcm = rs.get("competency_alignment", {}).get("kcm", {})
+            reasoning = (
+                f"<b>Rationale:</b> {escape(str(rs.get('question_type_rationale')))}<br/>"
+                f"<b>Bloom's Level:</b> {escape(str(q.get('blooms_level')))} ({escape(str(rs.get('blooms_level_justification')))})<br/>"
+                f"<b>Competency:</b> {escape(str(kcm.get('competency_area')))} - {escape(str(kcm.get('competency_theme')))}<br/>"
+                f"<b>Relevance:</b> {escape(str(q.get('relevance_percentage')))}%"
+            )
+            block.append(Spacer(1, 10))
+            block.append(Table([[Paragraph(reasoning, st["reasoning"])]], colWidths=[_RL_FRAME_WIDTH], style=_RL_REASONING_BOX_STYLE))
+            block.append(Spacer(1, 25))
+            story.append(KeepTogether(block))
+            q_counter += 1
+
+    SimpleDocTemplate(
+        _as_target(output), pagesize=A4,
+        leftMargin=_RL_MARGIN, rightMargin=_RL_MARGIN, topMargin=_RL_MARGIN, bottomMargin=_RL_MARGIN,
+    ).build(story)
+
+def generate_pdf(assessment_data: dict, output: Union[Path, str, BinaryIO], complex_layout: bool = PDF_COMPLEX_LAYOUT):
+    """
+    Generates the PDF report into a path or binary stream. Latin-script reports go
+    through the ReportLab fast path; anything else (or complex_layout=True) is
+    rendered by WeasyPrint (HTML-to-PDF) with the Noto script fonts.
+    """
+    if not complex_layout and can_use_fast_pdf(assessment_data):
+        generate_pdf_fast(assessment_data, output)
+        logger.info(f"Generated PDF with ReportLab: {output}")
+        return
 
-def generate_pdf(assessment_data: dict, output_path: Path):
-    """Generates a PDF report using WeasyPrint (HTML-to-PDF)."""
     try:
         html_content = generate_html_content(assessment_data)
         font_config = FontConfiguration()
-        HTML(string=html_content).write_pdf(target=str(output_path), font_config=font_config)
-        logger.info(f"Generated PDF with WeasyPrint: {output_path}")
+        HTML(string=html_content).write_pdf(target=_as_target(output), font_config=font_config)
+        logger.info(f"Generated PDF with WeasyPrint: {output}")
     except Exception as e:
         logger.error(f"WeasyPrint PDF Generation Failed: {e}")
         # Fallback? No, fail explicitly is better than bad boxes.
         raise
 
 
-def generate_docx(assessment_data: dict, output_path: Path):
-    """Generates a DOCX report from the assessment JSON data."""
+def _add_bold_line(doc, text: str):
+    doc.add_paragraph().add_run(text).bold = True
+
+def _add_styled_lines(body, style_id: Optional[str], lines):
+    # Appends <w:p> elements straight onto the body XML; equivalent to
+    # doc.add_paragraph(text, style=...) without the per-call wrapper objects
+    # and style-name lookup
+    for text in lines:
+        p = body.add_p()
+        p.style = style_id
+        if text:
+            p.add_r().text = text
+
+def generate_docx(assessment_data: dict, output: Union[Path, str, BinaryIO]):
+    """Generates a DOCX report from the assessment JSON data into a path or binary stream."""
     doc = Document()
     doc.add_heading('Course Assessment Report', 0)
 
@@ -196,6 +379,10 @@ def generate_docx(assessment_data: dict, output_path: Path):
     row_cells[1].text = str(blueprint.get("api_version", "N/A"))
     
     doc.add_heading('Questions & Reasoning', level=1)
+
+    # Resolved once; the bulk option/pair lines below reference it by id
+    body = doc.element.body
+    bullet_style_id = doc.styles['List Bullet'].style_id
     
     questions_obj = assessment_data.get("questions", {})
     
@@ -206,32 +393,24 @@ def generate_docx(assessment_data: dict, output_path: Path):
             doc.add_paragraph(f"Q{i}: {q.get('question_text', 'N/A')}", style='List Number')
             
             if q_type == "Multiple Choice Question":
-                for opt in q.get("options", []):
-                    doc.add_paragraph(f"- {opt.get('text', '')}", style='List Bullet')
-                p = doc.add_paragraph()
-                p.add_run(f"Correct Answer: Option {q.get('correct_option_index')}").bold = True
+                _add_styled_lines(body, bullet_style_id, (f"- {opt.get('text', '')}" for opt in q.get("options", [])))
+                _add_bold_line(doc, f"Correct Answer: Option {q.get('correct_option_index')}")
             
             elif q_type == "MTF Question":
-                for p_item in q.get("pairs", []):
-                    doc.add_paragraph(f"- {p_item.get('left')} -> {p_item.get('right')}", style='List Bullet')
+                _add_styled_lines(body, bullet_style_id, (f"- {p_item.get('left')} -> {p_item.get('right')}" for p_item in q.get("pairs", [])))
 
             elif q_type == "Multi-Choice Question":
-                for opt in q.get("options", []):
-                     doc.add_paragraph(f"[ ] {opt.get('text', '')}", style='List Bullet')
-                p = doc.add_paragraph()
+                _add_styled_lines(body, bullet_style_id, (f"[ ] {opt.get('text', '')}" for opt in q.get("options", [])))
                 corr = q.get('correct_option_index')
                 corr_str = ", ".join(map(str, corr)) if isinstance(corr, list) else str(corr)
-                p.add_run(f"Correct Options: {corr_str}").bold = True
+                _add_bold_line(doc, f"Correct Options: {corr_str}")
 
             elif q_type == "True/False Question":
-                 doc.add_paragraph(f"- True", style='List Bullet')
-                 doc.add_paragraph(f"- False", style='List Bullet')
-                 p = doc.add_paragraph()
-                 p.add_run(f"Correct Answer: {q.get('correct_answer')}").bold = True
+                _add_styled_lines(body, bullet_style_id, ("- True", "- False"))
+                _add_bold_line(doc, f"Correct Answer: {q.get('correct_answer')}")
             
             else:
-                 p = doc.add_paragraph()
-                 p.add_run(f"Answer: {q.get('correct_answer')}").bold = True
+                _add_bold_line(doc, f"Answer: {q.get('correct_answer')}")
 
             # Reasoning
             reasoning = q.get("reasoning", {})
@@ -242,4 +421,4 @@ def generate_docx(assessment_data: dict, output_path: Path):
             r_para.add_run(f"Bloom's: {q.get('blooms_level')} | Relevance: {q.get('relevance_percentage')}%\n")
             r_para.add_run(f"Competency: {kcm.get('competency_area')} - {kcm.get('competency_theme')}")
             
-    doc.save(str(output_path))
+    doc.save(_as_target(output))
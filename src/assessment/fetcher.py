@@ -1,15 +1,35 @@
 import os
-import json
+import orjson
 import asyncio
 import httpx
+import aiofiles
 import logging
 import re
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from .config import SEARCH_API_URL, TRANSCODER_STATS_URL, API_HEADERS
 
+# Optional fast HTML text extraction; falls back to a regex tag strip
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
 logger = logging.getLogger(__name__)
 
+# Concurrent downloads (PDFs, VTT lookups) and leaf nodes in flight at once
+DOWNLOAD_CONCURRENCY = 8
+LEAF_CONCURRENCY = 4
+# Written into a leaf folder once all of its files are downloaded
+LEAF_DONE_MARKER = ".done"
+# Written into the course folder once the root and every leaf are fully downloaded
+COURSE_DONE_MARKER = ".complete"
+_download_limit = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+_leaf_limit = asyncio.Semaphore(LEAF_CONCURRENCY)
+
+_HTML_TAG_RE = re.compile(r'<.*?>')
+_FILENAME_BAD_RE = re.compile(r'[<>:"/\\|?*]')
+
 async def fetch_course_data(course_id: str, output_base_path: Path):
     """
     Main entry point to fetch course data, PDFs, and VTTs.
@@ -17,11 +37,16 @@ async def fetch_course_data(course_id: str, output_base_path: Path):
     """
     output_base_path.mkdir(parents=True, exist_ok=True)
     
-    async with httpx.AsyncClient(timeout=30.0, headers=API_HEADERS) as client:
+    # API calls carry auth headers; CDN links are signed URLs and must go without
+    # them (avoids 401). One pooled HTTP/2 client each for the whole course.
+    async with httpx.AsyncClient(timeout=30.0, headers=API_HEADERS) as client, \
+            httpx.AsyncClient(timeout=30.0, http2=True) as cdn_client:
         # 0. Check for Local Cache (Fast Path)
         # We assume folder name == course_id mostly. 
         # If identifier differs, we might re-download once, which is acceptable safety.
-        potential_cache = output_base_path / course_id / "metadata.json"
+        # Only a course whose earlier fetch fully succeeded is skipped; a partial or
+        # crashed one is fetched again (finished leaves and files are still skipped)
+        potential_cache = output_base_path / course_id / COURSE_DONE_MARKER
         if potential_cache.exists():
              logger.info(f"Local cache found for {course_id}. Skipping download.")
              return True
@@ -36,19 +61,36 @@ async def fetch_course_data(course_id: str, output_base_path: Path):
         course_folder.mkdir(exist_ok=True)
 
         # 2. Process Root Node (Metadata, PDFs, Videos)
-        await process_node(client, root_node, course_folder)
+        root_ok = await process_node(client, cdn_client, root_node, course_folder)
 
-        # 3. Process Leaf Nodes
-        leaf_nodes = root_node.get("leafNodes", [])
-        for leaf_id in leaf_nodes:
-            try:
-                leaf_node = await search_content(client, leaf_id)
-                if leaf_node:
-                    leaf_folder = course_folder / leaf_node.get("identifier")
-                    leaf_folder.mkdir(exist_ok=True)
-                    await process_node(client, leaf_node, leaf_folder)
-            except Exception as e:
-                logger.error(f"Error processing leaf node {leaf_id}: {e}")
+        # 3. Process Leaf Nodes (concurrently, a few at a time)
+        async def _process_leaf(leaf_id: str) -> bool:
+            # A leaf that finished on an earlier run is left as is (no API calls)
+            done_marker = course_folder / leaf_id / LEAF_DONE_MARKER
+            if done_marker.exists() and (done_marker.parent / "metadata.json").exists():
+                return True
+            async with _leaf_limit:
+                try:
+                    leaf_node = await search_content(client, leaf_id)
+                    if leaf_node:
+                        leaf_folder = done_marker.parent
+                        leaf_folder.mkdir(exist_ok=True)
+                        # Only a fully downloaded leaf is skipped next time; partial ones are retried
+                        if await process_node(client, cdn_client, leaf_node, leaf_folder):
+                            done_marker.touch()
+                            return True
+                        logger.warning(f"Leaf node {leaf_id} has failed downloads; it will be retried on the next fetch")
+                except Exception as e:
+                    logger.error(f"Error processing leaf node {leaf_id}: {e}")
+            return False
+
+        # A leaf can be listed more than once in the tree; fetch each one once
+        leaf_ids = dict.fromkeys(root_node.get("leafNodes", []))
+        leaves_ok = await asyncio.gather(*(_process_leaf(leaf_id) for leaf_id in leaf_ids))
+        if root_ok and all(leaves_ok):
+            (course_folder / COURSE_DONE_MARKER).touch()
+        else:
+            logger.warning(f"Course {course_id} has failed downloads; it will be retried on the next fetch")
 
     return True
 
@@ -71,41 +113,59 @@ async def search_content(client: httpx.AsyncClient, identifier: str) -> Optional
         logger.error(f"Search failed for {identifier}: {e}")
         return None
 
-async def process_node(client: httpx.AsyncClient, node: Dict[str, Any], folder: Path):
+async def process_node(client: httpx.AsyncClient, cdn_client: httpx.AsyncClient, node: Dict[str, Any], folder: Path) -> bool:
+    """Downloads one node's metadata, PDFs and VTTs. Returns False if any download failed."""
     # Save Metadata
     metadata = extract_metadata(node)
-    (folder / "metadata.json").write_text(json.dumps(metadata, indent=2), encoding="utf-8")
+    (folder / "metadata.json").write_bytes(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
 
-    # Find and Download PDFs
+    # Find and Download PDFs (concurrently, bounded)
     pdfs = find_pdf_resources(node)
+    # PDFs that sanitize to the same filename would overwrite each other anyway;
+    # download each target once (last entry wins, as with serial downloads)
+    targets = {folder / (sanitize_filename(pdf["name"]) + ".pdf"): pdf for pdf in pdfs}
+
+    async def _download_pdf(file_path: Path, pdf: Dict[str, str]) -> bool:
+        async with _download_limit:
+            try:
+                await download_file(client, pdf["url"], file_path)
+                return True
+            except Exception as e:
+                logger.error(f"Failed to download PDF {pdf['name']}: {e}")
+                return False
+
+    results = await asyncio.gather(*(_download_pdf(path, pdf) for path, pdf in targets.items()))
+    ok_by_path = dict(zip(targets, results))
+
     pdf_links = []
     for pdf in pdfs:
-        try:
-            filename = sanitize_filename(pdf["name"]) + ".pdf"
-            file_path = folder / filename
-            await download_file(client, pdf["url"], file_path)
+        if ok_by_path[folder / (sanitize_filename(pdf["name"]) + ".pdf")]:
             pdf_links.append(f"{pdf['name']} - {pdf['url']}")
-        except Exception as e:
-            logger.error(f"Failed to download PDF {pdf['name']}: {e}")
+        else:
             pdf_links.append(f"{pdf['name']} - [FAILED] {pdf['url']}")
     
     (folder / "pdf_links.txt").write_text("\n".join(pdf_links), encoding="utf-8")
 
-    # Find and Download VTTs
+    # Find and Download VTTs (concurrently, bounded; concatenated in video order)
     videos = find_video_mp4_children(node)
-    english_vtt_content = ""
-    
-    for video in videos:
+
+    async def _video_vtt(video: Dict[str, Any]) -> Tuple[str, bool]:
         video_id = video.get("identifier")
         video_name = video.get("name", video_id)
         video_folder = folder / sanitize_filename(video_name)
         video_folder.mkdir(exist_ok=True)
 
-        vtt_text = await fetch_vtt_for_video(client, video_id, video_folder)
+        async with _download_limit:
+            vtt_text, vtt_ok = await fetch_vtt_for_video(client, cdn_client, video_id, video_folder)
         if vtt_text:
-            english_vtt_content += f"\n\nNOTE: From video \"{video_name}\"\n\n{vtt_text}\n"
+            return f"\n\nNOTE: From video \"{video_name}\"\n\n{vtt_text}\n", vtt_ok
+        return "", vtt_ok
+
+    vtt_results = await asyncio.gather(*(_video_vtt(v) for v in videos))
+    english_vtt_content = "".join(text for text, _ in vtt_results)
 
     (folder / "english_subtitles.vtt").write_text(english_vtt_content.strip() or "// No English subtitles found", encoding="utf-8")
+    return all(results) and all(ok for _, ok in vtt_results)
 
 def extract_metadata(node: Dict[str, Any]) -> Dict[str, Any]:
     competencies = node.get("competencies_v6", [])
@@ -123,29 +183,31 @@ def extract_metadata(node: Dict[str, Any]) -> Dict[str, Any]:
         "scorm": False
     }
 
-def find_pdf_resources(node: Dict[str, Any], found=None) -> List[Dict[str, str]]:
-    if found is None:
-        found = []
-    
-    if node.get("mimeType") == "application/pdf" and node.get("artifactUrl"):
-        found.append({"name": node.get("name", "Unnamed PDF"), "url": node.get("artifactUrl")})
-    
-    for child in node.get("children", []):
-        find_pdf_resources(child, found)
+# Tree walks below are iterative pre-order DFS; children are pushed in reverse
+# so results come out in the same order as a recursive walk.
+def find_pdf_resources(root: Dict[str, Any]) -> List[Dict[str, str]]:
+    found = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.get("mimeType") == "application/pdf" and node.get("artifactUrl"):
+            found.append({"name": node.get("name", "Unnamed PDF"), "url": node["artifactUrl"]})
+        stack.extend(reversed(node.get("children", ())))
     return found
 
-def find_video_mp4_children(node: Dict[str, Any], found=None) -> List[Dict[str, Any]]:
-    if found is None:
-        found = []
-    
-    if node.get("mimeType") == "video/mp4":
-        found.append(node)
-    
-    for child in node.get("children", []):
-        find_video_mp4_children(child, found)
+def find_video_mp4_children(root: Dict[str, Any]) -> List[Dict[str, Any]]:
+    found = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.get("mimeType") == "video/mp4":
+            found.append(node)
+        stack.extend(reversed(node.get("children", ())))
     return found
 
-async def fetch_vtt_for_video(client: httpx.AsyncClient, video_id: str, video_folder: Path) -> str:
+async def fetch_vtt_for_video(client: httpx.AsyncClient, cdn_client: httpx.AsyncClient, video_id: str, video_folder: Path) -> Tuple[str, bool]:
+    # Returns (English VTT text, whether every lookup/download succeeded)
+    complete = True
     try:
         url = f"{TRANSCODER_STATS_URL}?resource_id={video_id}"
         resp = await client.get(url)
@@ -159,48 +221,76 @@ async def fetch_vtt_for_video(client: httpx.AsyncClient, video_id: str, video_fo
             # Check for 'en' or 'english' in path
             if "/en/" in vtt_url.lower() or "/english/" in vtt_url.lower():
                 try:
-                    # Use a fresh client without headers for CDN links (avoids 401 on signed URLs)
-                    async with httpx.AsyncClient() as cdn_client:
-                        vtt_resp = await cdn_client.get(vtt_url)
+                    vtt_path = video_folder / "en" / vtt_url.split("/")[-1]
+                    if _is_downloaded(vtt_path):
+                        combined_text += vtt_path.read_text(encoding="utf-8") + "\n"
+                        continue
+
+                    vtt_resp = await cdn_client.get(vtt_url)
                     
                     if vtt_resp.status_code == 200:
                         text = vtt_resp.text
-                        filename = vtt_url.split("/")[-1]
-                        (video_folder / "en").mkdir(exist_ok=True)
-                        (video_folder / "en" / filename).write_text(text, encoding="utf-8")
+                        vtt_path.parent.mkdir(exist_ok=True)
+                        vtt_path.write_text(text, encoding="utf-8")
                         combined_text += text + "\n"
                     else:
                         logger.warning(f"Failed to fetch VTT {vtt_url}: {vtt_resp.status_code}")
+                        complete = False
                 except Exception as e:
                     logger.error(f"Error fetching VTT {vtt_url}: {e}")
-        return combined_text
+                    complete = False
+        return combined_text, complete
     except Exception as e:
         logger.warning(f"Failed to fetch VTT stats for {video_id}: {e}")
-        return ""
+        return "", False
 
-def extract_vtt_urls(obj: Any, found=None) -> List[str]:
-    if found is None:
-        found = []
-    
-    if isinstance(obj, str) and obj.endswith(".vtt"):
-        found.append(obj)
-    elif isinstance(obj, list):
-        for item in obj:
-            extract_vtt_urls(item, found)
-    elif isinstance(obj, dict):
-        for value in obj.values():
-            extract_vtt_urls(value, found)
+def extract_vtt_urls(root: Any) -> List[str]:
+    found = []
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, str):
+            if obj.endswith(".vtt"):
+                found.append(obj)
+        elif isinstance(obj, list):
+            stack.extend(reversed(obj))
+        elif isinstance(obj, dict):
+            stack.extend(reversed(obj.values()))
     return found
 
+DOWNLOAD_CHUNK_SIZE = 1 << 16  # 64 KiB
+
+def _is_downloaded(path: Path) -> bool:
+    # Downloads are renamed into place only once complete, so any non-empty
+    # file left by an earlier run is whole
+    try:
+        return path.stat().st_size > 0
+    except FileNotFoundError:
+        return False
+
 async def download_file(client: httpx.AsyncClient, url: str, path: Path):
-    resp = await client.get(url)
-    resp.raise_for_status()
-    path.write_bytes(resp.content)
+    if _is_downloaded(path):
+        return
+    # Stream to a temp file so memory stays flat and a failed transfer never
+    # leaves a truncated file where the generator would pick it up
+    tmp_path = path.with_name(path.name + ".part")
+    try:
+        async with client.stream("GET", url) as resp:
+            resp.raise_for_status()
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    await f.write(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
 def strip_html(html: str) -> str:
-    clean = re.compile('<.*?>')
-    text = re.sub(clean, '', html)
-    return text.replace('&nbsp;', ' ').strip()
+    if not html:
+        return ''
+    if HTMLParser is not None:
+        # C-level tokenizer; also handles '>' inside attributes and decodes entities
+        return HTMLParser(html).text(separator='').replace('\xa0', ' ').strip()
+    return _HTML_TAG_RE.sub('', html).replace('&nbsp;', ' ').strip()
 
 def sanitize_filename(name: str) -> str:
-    return re.sub(r'[<>:"/\\|?*]', '_', name).strip()
+    return _FILENAME_BAD_RE.sub('_', name).strip()
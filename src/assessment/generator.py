@@ -1,11 +1,16 @@
 import os
-import json
-import hashlib
+import re
+import functools
+import orjson
+import xxhash
 import asyncio
 import logging
+import multiprocessing
 import time
 import yaml
 import fitz  # PyMuPDF
+from concurrent.futures import ProcessPoolExecutor
+from cachetools import LRUCache, TTLCache
 from pathlib import Path
 from typing import Dict, Any, Tuple, Optional, List
 from google import genai
@@ -16,7 +21,8 @@ from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_excep
 from .config import (
     DB_DSN,
     GOOGLE_PROJECT_ID, GOOGLE_LOCATION, GENAI_MODEL_NAME, 
-    GOOGLE_APPLICATION_CREDENTIALS, PROMPT_VERSION
+    GOOGLE_APPLICATION_CREDENTIALS, PROMPT_VERSION,
+    INTERACTIVE_COURSES_PATH, PDF_EXTRACT_WORKERS, EXTRACT_CACHE_CHARS, YAML_LOADER
 )
 
 logger = logging.getLogger(__name__)
@@ -37,24 +43,75 @@ else:
 PACKAGE_DIR = Path(__file__).parent
 RESOURCE_DIR = PACKAGE_DIR / "resources"
 
-def load_yaml(filename):
+# Parsed resources are cached per (path, mtime); an edited file is re-read on
+# the next load, an unchanged one never is
+@functools.lru_cache(maxsize=None)
+def _parse_resource(path: Path, mtime_ns: int):
+    if path.suffix in ('.yaml', '.yml'):
+        with open(path, 'rb') as f:
+            return yaml.load(f, Loader=YAML_LOADER)
+    return orjson.loads(path.read_bytes())
+
+def _load_resource(filename):
     path = RESOURCE_DIR / filename
-    if path.exists():
-        with open(path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
-    return {}
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    return _parse_resource(path, mtime_ns)
+
+def load_yaml(filename):
+    return _load_resource(filename)
 
 def load_json(filename):
-    path = RESOURCE_DIR / filename
-    if path.exists():
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    return _load_resource(filename)
 
 ASSESSMENT_PROMPTS = load_yaml('prompts.yaml')
 ASSESSMENT_SCHEMA_FILE = load_json('schemas.json')
 ASSESSMENT_SCHEMA = ASSESSMENT_SCHEMA_FILE.get('full_schema', {})
-KCM_DATASET = load_json('competencies.json')
+# competencies.json is stored in the exact 2-space form the prompt embeds,
+# so the text goes into the prompt as is without ever parsing it
+_KCM_PATH = RESOURCE_DIR / 'competencies.json'
+KCM_JSON_STR = _KCM_PATH.read_text(encoding='utf-8').rstrip() if _KCM_PATH.exists() else "{}"
+
+# Default Bloom's distributions used when the request does not specify one
+BLOOMS_DIST_COMPREHENSIVE = "Apply: 40%, Analyze: 30%, Evaluate: 30%"
+BLOOMS_DIST_DEFAULT = "Remember: 20%, Understand: 25%, Apply: 25%, Analyze: 20%, Evaluate: 10%"
+
+_PROMPT_PLACEHOLDER_RE = re.compile(
+    r"\{(course_context|content_context|additional_instructions|input_language|kcm_dataset"
+    r"|assessment_type|difficulty_level|total_questions_x3|time_to_complete"
+    r"|question_type_instructions|topic_names|blooms_distribution|p_version|a_version)\}"
+)
+# Question type keys and their prompt labels, in prompt order
+_PROMPT_QUESTION_TYPES = (
+    ("mcq", "Multiple Choice Questions (MCQs)"),
+    ("ftb", "Fill in the Blank Questions (FTBs)"),
+    ("mtf", "Match the Following Questions (MTFs)"),
+    ("multichoice", "Multi-Choice Questions"),
+    ("truefalse", "True/False Questions"),
+)
+
+# Placeholders whose values are fixed for the process lifetime
+_STATIC_PROMPT_VALUES = {
+    "kcm_dataset": KCM_JSON_STR,
+    "p_version": PROMPT_VERSION,
+    "a_version": "api/v1",
+}
+
+def _compile_prompt_template(template: str) -> List[str]:
+    # Split into [literal, key, literal, key, ..., literal] and fold the static
+    # values into the surrounding literals, so only per-request keys remain
+    segments = [""]
+    for i, segment in enumerate(_PROMPT_PLACEHOLDER_RE.split(template)):
+        if i % 2 and segment not in _STATIC_PROMPT_VALUES:
+            segments += [segment, ""]
+        else:
+            segments[-1] += _STATIC_PROMPT_VALUES[segment] if i % 2 else segment
+    return segments
+
+# The template is fixed for the process lifetime; build_prompt only fills the keys
+_PROMPT_SEGMENTS = _compile_prompt_template(ASSESSMENT_PROMPTS.get('system_prompt_template', ''))
 
 async def generate_assessment(
     question_type_counts: Dict[str, int],
@@ -70,20 +127,18 @@ async def generate_assessment(
     blooms_distribution: Optional[Dict[str, int]] = None,
     question_types: List[str] = ["mcq", "ftb", "mtf"],
     time_limit: Optional[int] = None,
-    extra_files: Optional[List[Path]] = None
+    extra_files: Optional[List[Path]] = None,
+    force: bool = False
 ) -> Tuple[Dict, Dict, Dict]:
     """
     Generates assessment for one or multiple courses.
     Returns (aggregated_metadata, assessment_json, usage_metadata)
+    force=True bypasses the in-process LLM response cache.
     """
     # Normalize inputs
     if not course_ids and course_folder:
         course_ids = [course_folder.name]
     
-    # Normalize inputs
-    if not course_ids and course_folder:
-        course_ids = [course_folder.name]
-    
     # if not course_ids:
     #     raise ValueError("No course_ids provided.")
 
@@ -94,8 +149,8 @@ async def generate_assessment(
     else:
         composite_id = "custom_content_generation"
     
-    # Base Path for Interactive Courses (should probably be passed in, but using config implied path for now)
-    base_path = Path("/app/interactive_courses_data") 
+    # Base Path for Interactive Courses (same root the fetcher writes into)
+    base_path = INTERACTIVE_COURSES_PATH
     
     logger.info(f"Generating assessment for {composite_id} (Type: {assessment_type})")
 
@@ -115,47 +170,47 @@ async def generate_assessment(
                 continue
                 
             # Metadata
-            meta_path = c_path / "metadata.json"
-            if meta_path.exists():
-                meta = json.loads(meta_path.read_text(encoding='utf-8'))
+            meta = _load_course_metadata(c_path / "metadata.json")
+            if meta is not None:
                 aggregated_metadata["courses"].append(meta)
                 
-            # Transcript (Recursive - find all english_subtitles.vtt in subfolders)
-            for vtt_path in c_path.rglob("english_subtitles.vtt"):
-                 try:
-                     text = await extract_vtt_text(vtt_path)
-                     if not text: continue
-                     
-                     # Deduplication Check
-                     text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-                     if text_hash in seen_content_hashes:
-                         logger.info(f"Skipping duplicate VTT content: {vtt_path.name}")
-                         continue
-                     seen_content_hashes.add(text_hash)
-                     
-                     rel_path = vtt_path.relative_to(c_path)
-                     combined_transcript.append(f"--- SOURCE: {cid} / {rel_path} ---\n{text}")
-                 except Exception as e:
-                     logger.warning(f"Failed to read VTT {vtt_path}: {e}")
+            # Transcript (Recursive - find all english_subtitles.vtt in subfolders), read in parallel
+            vtt_files, pdf_files = _find_content_files(c_path)
+            # Walked paths all start with "<c_path>/", so the relative part is a slice
+            rel_start = len(str(c_path)) + 1
+            source_prefix = f"--- SOURCE: {cid} / "
+            vtt_texts = await asyncio.gather(*(_extract_cached(p, extract_vtt_text) for p in vtt_files), return_exceptions=True)
+            for vtt_path, result in zip(vtt_files, vtt_texts):
+                if isinstance(result, Exception):
+                    logger.warning(f"Failed to read VTT {vtt_path}: {result}")
+                    continue
+                text, text_hash = result
+                if not text: continue
+
+                # Deduplication Check
+                if text_hash in seen_content_hashes:
+                    logger.info(f"Skipping duplicate VTT content: {vtt_path.name}")
+                    continue
+                seen_content_hashes.add(text_hash)
+
+                combined_transcript.append(f"{source_prefix}{str(vtt_path)[rel_start:]} ---\n{text}")
                 
-            # PDFs (Recursive - find all PDFs in subfolders)
-            for pdf_file in c_path.rglob("*.pdf"):
-                 # Avoid reading the same file if multiple symlinks or structure exists
-                 try:
-                    text = await extract_pdf_text(pdf_file)
-                    if not text: continue
-    
-                    # Deduplication Check
-                    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-                    if text_hash in seen_content_hashes:
-                        logger.info(f"Skipping duplicate PDF content: {pdf_file.name}")
-                        continue
-                    seen_content_hashes.add(text_hash)
-    
-                    rel_path = pdf_file.relative_to(c_path)
-                    combined_pdfs.append(f"--- SOURCE: {cid} / {rel_path} ---\n{text}")
-                 except Exception as e:
-                     logger.warning(f"Failed to read PDF {pdf_file}: {e}")
+            # PDFs (Recursive - find all PDFs in subfolders), extracted in parallel
+            pdf_texts = await asyncio.gather(*(_extract_cached(p, extract_pdf_text) for p in pdf_files), return_exceptions=True)
+            for pdf_file, result in zip(pdf_files, pdf_texts):
+                if isinstance(result, Exception):
+                    logger.warning(f"Failed to read PDF {pdf_file}: {result}")
+                    continue
+                pages, text_hash = result
+                if not pages: continue
+
+                # Deduplication Check
+                if text_hash in seen_content_hashes:
+                    logger.info(f"Skipping duplicate PDF content: {pdf_file.name}")
+                    continue
+                seen_content_hashes.add(text_hash)
+
+                _append_pages(combined_pdfs, f"{source_prefix}{str(pdf_file)[rel_start:]} ---", pages)
     else:
         # Dummy Metadata for Custom Uploads
         aggregated_metadata["courses"].append({
@@ -166,24 +221,29 @@ async def generate_assessment(
 
     # Process Extra Uploaded Files (from API)
     if extra_files:
-        for fpath in extra_files:
-            if fpath.suffix.lower() == '.pdf':
-                text = await extract_pdf_text(fpath)
-                combined_pdfs.append(f"--- UPLOADED FILE: {fpath.name} ---\n{text}")
-            elif fpath.suffix.lower() == '.vtt':
-                text = await extract_vtt_text(fpath)
-                combined_transcript.append(f"--- UPLOADED FILE: {fpath.name} ---\n{text}")
+        extra_pdfs = [f for f in extra_files if f.suffix.lower() == '.pdf']
+        extra_pdf_texts = await asyncio.gather(*(extract_pdf_text(f) for f in extra_pdfs))
+        for fpath, pages in zip(extra_pdfs, extra_pdf_texts):
+            _append_pages(combined_pdfs, f"--- UPLOADED FILE: {fpath.name} ---", pages)
+        extra_vtts = [f for f in extra_files if f.suffix.lower() == '.vtt']
+        extra_vtt_texts = await asyncio.gather(*(extract_vtt_text(f) for f in extra_vtts))
+        for fpath, text in zip(extra_vtts, extra_vtt_texts):
+            combined_transcript.append(f"--- UPLOADED FILE: {fpath.name} ---\n{text}")
 
     final_transcript_str = "\n\n".join(combined_transcript) if combined_transcript else "N/A"
     final_pdf_str = "\n\n".join(combined_pdfs) if combined_pdfs else "N/A"
+    # Drop the per-page pieces now that they are joined, so the prompt build
+    # below does not hold the extracted text in memory twice over
+    combined_transcript.clear()
+    combined_pdfs.clear()
     
     # 2. Format Bloom's Distribution
     if not blooms_distribution:
         # Default Logic
         if assessment_type == "comprehensive":
-            blooms_str = "Apply: 40%, Analyze: 30%, Evaluate: 30%"
+            blooms_str = BLOOMS_DIST_COMPREHENSIVE
         else:
-            blooms_str = "Remember: 20%, Understand: 25%, Apply: 25%, Analyze: 20%, Evaluate: 10%"
+            blooms_str = BLOOMS_DIST_DEFAULT
     else:
         # User defined
         blooms_str = ", ".join([f"{k}: {v}%" for k,v in blooms_distribution.items()])
@@ -194,7 +254,7 @@ async def generate_assessment(
     # 4. Build Prompt
     prompt = build_prompt(
         question_type_counts=question_type_counts,
-        course_context=json.dumps(aggregated_metadata, indent=2),
+        course_context=orjson.dumps(aggregated_metadata, option=orjson.OPT_INDENT_2).decode(),
         transcript=final_transcript_str,
         pdf_snippets=final_pdf_str,
         assessment_type=assessment_type,
@@ -209,15 +269,54 @@ async def generate_assessment(
     )
     
     # 5. Call LLM
-    response_text, usage = await call_llm(prompt)
+    prompt_key = xxhash.xxh3_128_intdigest(prompt.encode('utf-8'))
+    cached = None if force else _llm_response_cache.get(prompt_key)
+    if cached:
+        logger.info(f"Reusing cached LLM response for {composite_id}")
+        # No tokens were spent on this job; the original call's counts stay with the original job
+        response_text, usage = cached[0], dict(CACHED_LLM_USAGE)
+    else:
+        response_text, usage = await call_llm(prompt)
     
     try:
-        result_json = json.loads(response_text)
+        result_json = orjson.loads(response_text)
+        # Only cache responses that parsed, so a bad answer is not replayed
+        if not cached:
+            _llm_response_cache[prompt_key] = (response_text, usage)
         return aggregated_metadata, result_json, usage
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logger.error("Failed to parse LLM response as JSON")
         raise ValueError("LLM response was not valid JSON")
 
+def _find_content_files(c_path: Path) -> Tuple[List[Path], List[Path]]:
+    # One directory walk for both transcripts and PDFs, in the same top-down
+    # order rglob would give; Path objects are only built for matches
+    vtt_files, pdf_files = [], []
+    for dirpath, _, filenames in os.walk(c_path):
+        for name in filenames:
+            if name == "english_subtitles.vtt":
+                vtt_files.append(Path(dirpath, name))
+            elif name.endswith(".pdf"):
+                pdf_files.append(Path(dirpath, name))
+    return vtt_files, pdf_files
+
+# Parsed course metadata.json by path, reused until the file's mtime changes;
+# bounded so a long-running process does not keep every course it has seen
+COURSE_META_CACHE_SIZE = 1024
+_course_meta_cache: LRUCache = LRUCache(maxsize=COURSE_META_CACHE_SIZE)
+
+def _load_course_metadata(meta_path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        mtime = meta_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _course_meta_cache.get(meta_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    meta = orjson.loads(meta_path.read_bytes())
+    _course_meta_cache[meta_path] = (mtime, meta)
+    return meta
+
 def build_prompt(
     question_type_counts:Dict[str, int],
     course_context: str, 
@@ -233,64 +332,48 @@ def build_prompt(
     blooms_distribution: str,
     question_types: List[str]
 ) -> str:
-    prompt_template = ASSESSMENT_PROMPTS.get('system_prompt_template', '')
-    
-    # Placeholder Replacement
-    prompt = prompt_template.replace("{course_context}", course_context)
-    prompt = prompt.replace("{content_context}", f"TRANSCRIPTS:\n{transcript}\n\nPDF CONTENT:\n{pdf_snippets}")
-    prompt = prompt.replace("{additional_instructions}", additional_instructions or "None provided")
-    prompt = prompt.replace("{input_language}", input_language)
-    prompt = prompt.replace("{kcm_dataset}", json.dumps(KCM_DATASET, indent=2))
-    
-    prompt = prompt.replace("{assessment_type}", assessment_type)
-    prompt = prompt.replace("{difficulty_level}", difficulty_level)
-    prompt = prompt.replace("{total_questions_x3}", str(total_questions))
-    # prompt = prompt.replace("{total_questions_x3}", str(total_questions * len(question_types)))
-    prompt = prompt.replace("{time_to_complete}", time_to_complete or "Not provided (use standard pacing)")
-
     # v3.3 Specifics (Question Types)
-    q_instructions = ""
-    if "mcq" in question_types:
-        count = question_type_counts.get('mcq', 5)
-        q_instructions += f"\n     - {count} Multiple Choice Questions (MCQs)"
-    else:
-        q_instructions += "\n     - 0 Multiple Choice Questions (MCQs) [DO NOT GENERATE]"
-
-    if "ftb" in question_types:
-        count = question_type_counts.get('ftb', 5)
-        q_instructions += f"\n     - {count} Fill in the Blank Questions (FTBs)"
-    else:
-        q_instructions += "\n     - 0 Fill in the Blank Questions (FTBs) [DO NOT GENERATE]"
-
-    if "mtf" in question_types:
-        count = question_type_counts.get('mtf', 5)
-        q_instructions += f"\n     - {count} Match the Following Questions (MTFs)"
-    else:
-        q_instructions += "\n     - 0 Match the Following Questions (MTFs) [DO NOT GENERATE]"
-
-    if "multichoice" in question_types:
-        count = question_type_counts.get('multichoice', 5)
-        q_instructions += f"\n     - {count} Multi-Choice Questions"
-    else:
-        q_instructions += "\n     - 0 Multi-Choice Questions [DO NOT GENERATE]"
-        
-    if "truefalse" in question_types:
-        count = question_type_counts.get('truefalse', 5)
-        q_instructions += f"\n     - {count} True/False Questions"
-    else:
-        q_instructions += "\n     - 0 True/False Questions [DO NOT GENERATE]"
-
-    prompt = prompt.replace("{question_type_instructions}", q_instructions)
-
+    q_instructions = "".join(
+        f"\n     - {question_type_counts.get(key, 5)} {label}" if key in question_types
+        else f"\n     - 0 {label} [DO NOT GENERATE]"
+        for key, label in _PROMPT_QUESTION_TYPES
+    )
 
-    # v3.2 Specifics
-    prompt = prompt.replace("{topic_names}", topic_names)
-    prompt = prompt.replace("{blooms_distribution}", blooms_distribution)
-    
-    prompt = prompt.replace("{p_version}", PROMPT_VERSION)
-    prompt = prompt.replace("{a_version}", "api/v1")
+    # Placeholder Replacement (fills the pre-split template segments)
+    mapping = {
+        "course_context": course_context,
+        "additional_instructions": additional_instructions or "None provided",
+        "input_language": input_language,
+        "assessment_type": assessment_type,
+        "difficulty_level": difficulty_level,
+        "total_questions_x3": str(total_questions),
+        # "total_questions_x3": str(total_questions * len(question_types)),
+        "time_to_complete": time_to_complete or "Not provided (use standard pacing)",
+        "question_type_instructions": q_instructions,
+        # v3.2 Specifics
+        "topic_names": topic_names,
+        "blooms_distribution": blooms_distribution,
+    }
+    # content_context is spliced in as pieces so the (large) transcript and PDF
+    # text are copied only once, by the final join
+    content_context = ("TRANSCRIPTS:\n", transcript, "\n\nPDF CONTENT:\n", pdf_snippets)
+    parts = []
+    for i, segment in enumerate(_PROMPT_SEGMENTS):
+        if not i % 2:
+            parts.append(segment)
+        elif segment == "content_context":
+            parts.extend(content_context)
+        else:
+            parts.append(mapping[segment])
+    return "".join(parts)
 
-    return prompt
+# Recent LLM responses keyed by prompt digest: an identical prompt (e.g. a job
+# re-queued after a failed save) reuses the answer instead of another Vertex call
+LLM_CACHE_SIZE = 64
+LLM_CACHE_TTL = 3600  # seconds
+_llm_response_cache: TTLCache = TTLCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL)
+# token_usage recorded for a job answered from _llm_response_cache
+CACHED_LLM_USAGE = {"cached": True, "prompt_token_count": 0, "candidates_token_count": 0, "total_token_count": 0}
 
 @retry(retry=retry_if_exception_type((Exception, APIError)), stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
 async def call_llm(prompt: str) -> Tuple[str, Dict[str, Any]]:
@@ -307,50 +390,158 @@ async def call_llm(prompt: str) -> Tuple[str, Dict[str, Any]]:
 
     contents = [types.Content(role="user", parts=[types.Part.from_text(text=prompt)])]
 
-    response = await client.aio.models.generate_content(
+    # Stream the answer so it is collected while the model is still generating;
+    # usage metadata is complete on the last chunk that carries it
+    text_parts = []
+    usage_metadata = None
+    async for chunk in await client.aio.models.generate_content_stream(
         model=GENAI_MODEL_NAME,
         contents=contents,
         config=config
-    )
-    
+    ):
+        if chunk.text:
+            text_parts.append(chunk.text)
+        if chunk.usage_metadata:
+            usage_metadata = chunk.usage_metadata
+
     llm_usage = {}
-    if response.usage_metadata:
-        llm_usage = response.usage_metadata.to_json_dict()
+    if usage_metadata:
+        llm_usage = usage_metadata.to_json_dict()
 
-    if not response.text:
+    response_text = "".join(text_parts)
+    if not response_text:
         raise RuntimeError("LLM returned an empty response text.")
     
-    return response.text, llm_usage
+    return response_text, llm_usage
+
+# Captures each stripped, non-empty VTT line that is not the WEBVTT header,
+# a cue number, or a timing line; the whole file is scanned in one C-level pass
+_VTT_TEXT_LINE_RE = re.compile(
+    r'^[^\S\n]*'              # leading whitespace (strip)
+    r'(?!(?i:webvtt))'        # header line
+    r'(?!\d+[^\S\n]*$)'       # cue number
+    r'(?![^\n]*-->)'          # timing line
+    r'(\S[^\n]*?)[^\S\n]*$',   # text, minus trailing whitespace
+    re.M
+)
 
-async def extract_vtt_text(vtt_path: Path) -> str:
-    def _read_and_clean():
-        text_lines = []
-        try:
-            raw = vtt_path.read_text(encoding='utf-8')
-        except Exception:
-            raw = vtt_path.read_text(encoding='latin-1')
-            
-        for line in raw.splitlines():
-            line = line.strip()
-            if not line or line.upper().startswith('WEBVTT') or '-->' in line or line.isdigit():
-                continue
-            text_lines.append(line)
-        return '\n'.join(text_lines)
+def extract_vtt_text_sync(vtt_path: Path) -> str:
+    try:
+        raw = vtt_path.read_text(encoding='utf-8')
+    except Exception:
+        raw = vtt_path.read_text(encoding='latin-1')
 
-    return await asyncio.to_thread(_read_and_clean)
+    return '\n'.join(_VTT_TEXT_LINE_RE.findall(raw))
 
-def extract_pdf_text_sync(pdf_path: Path) -> str:
+async def extract_vtt_text(vtt_path: Path) -> str:
+    return await asyncio.to_thread(extract_vtt_text_sync, vtt_path)
+
+def _hash_pages(pages: List[str]) -> int:
+    # Same digest as hashing '\n\n'.join(pages), without building the joined string.
+    # Dedup only, so a fast non-cryptographic hash (xxh3) is enough.
+    h = xxhash.xxh3_128(pages[0].encode('utf-8'))
+    for page in pages[1:]:
+        h.update(b'\n\n')
+        h.update(page.encode('utf-8'))
+    return h.intdigest()
+
+# Extracted course text keyed by (path, mtime, size): regenerating a course
+# skips PyMuPDF and VTT parsing entirely. Bounded by total characters held
+# (EXTRACT_CACHE_CHARS, per process).
+_extract_cache: LRUCache = LRUCache(maxsize=EXTRACT_CACHE_CHARS, getsizeof=lambda entry: entry[2])
+
+async def _extract_cached(path: Path, extract) -> Tuple[Any, Optional[int]]:
+    # Returns (content, dedup hash); content is a VTT string or a list of PDF pages
+    st = path.stat()
+    key = (str(path), st.st_mtime_ns, st.st_size)
+    hit = _extract_cache.get(key)
+    if hit:
+        return hit[0], hit[1]
+    content = await extract(path)
+    if not content:
+        return content, None
+    pages = [content] if isinstance(content, str) else content
+    size = sum(map(len, pages))
+    text_hash = _hash_pages(pages)
+    if size <= EXTRACT_CACHE_CHARS:
+        _extract_cache[key] = (content, text_hash, size)
+    return content, text_hash
+
+def _append_pages(parts: List[str], header: str, pages: List[str]):
+    # Pages go into the shared parts list as-is; the single final '\n\n'.join
+    # yields the same text as joining each PDF separately first
+    parts.append(f"{header}\n{pages[0] if pages else ''}")
+    parts.extend(pages[1:])
+
+# Plain text extraction: keep whitespace and clip to the page, but expand ligatures
+# (no TEXT_PRESERVE_LIGATURES) so the prompt gets ordinary characters
+_PDF_TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+def extract_pdf_text_sync(pdf_path: Path, start: int = 0, end: Optional[int] = None) -> List[str]:
+    # Non-empty page texts for pages [start, end); the whole document by default
     text_parts = []
     try:
-        doc = fitz.open(str(pdf_path))
-        for page in doc:
-            page_text = page.get_text().strip()
+        doc = fitz.open(str(pdf_path), filetype="pdf")
+        for page in doc.pages(start, end):
+            page_text = page.get_text("text", flags=_PDF_TEXT_FLAGS).strip()
             if page_text:
                 text_parts.append(page_text)
         doc.close()
     except Exception as e:
         logger.exception('PDF extraction failed for %s: %s', pdf_path, e)
-    return '\n\n'.join(text_parts)
+    return text_parts
 
-async def extract_pdf_text(pdf_path: Path) -> str:
-    return await asyncio.get_running_loop().run_in_executor(None, extract_pdf_text_sync, pdf_path)
+def _pdf_page_count(pdf_path: Path) -> int:
+    try:
+        with fitz.open(str(pdf_path), filetype="pdf") as doc:
+            return doc.page_count
+    except Exception:
+        return 0
+
+# PyMuPDF text extraction is CPU-bound, so it runs in worker processes.
+# Created on first use; spawn avoids forking a process that already has threads.
+# Each worker re-imports this module, so the default stays small: os.cpu_count() is the
+# host's count inside a container, and every API process gets its own pool.
+PDF_POOL_DEFAULT_MAX = 4
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_size = PDF_EXTRACT_WORKERS or min(os.cpu_count() or 1, PDF_POOL_DEFAULT_MAX)
+
+# Documents longer than this are split into contiguous page ranges, one pool task each
+PDF_PAGES_PER_TASK = 32
+# Counting pages means opening the file once more in this process, so only files
+# at least this large are considered for splitting; smaller ones go to one worker as is
+PDF_SPLIT_MIN_BYTES = 4 * 1024 * 1024
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=_pdf_pool_size,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pdf_pool
+
+def shutdown_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=True, cancel_futures=True)
+        _pdf_pool = None
+
+async def extract_pdf_text(pdf_path: Path) -> List[str]:
+    loop = asyncio.get_running_loop()
+    pool = _get_pdf_pool()
+    if _pdf_pool_size <= 1 or pdf_path.stat().st_size < PDF_SPLIT_MIN_BYTES:
+        return await loop.run_in_executor(pool, extract_pdf_text_sync, pdf_path)
+    page_count = await asyncio.to_thread(_pdf_page_count, pdf_path)
+    n_tasks = min(_pdf_pool_size, -(-page_count // PDF_PAGES_PER_TASK))
+    if n_tasks <= 1:
+        return await loop.run_in_executor(pool, extract_pdf_text_sync, pdf_path)
+
+    # Each worker opens the file itself (MuPDF documents are not picklable);
+    # gather keeps the ranges in page order
+    step = -(-page_count // n_tasks)
+    chunks = await asyncio.gather(*(
+        loop.run_in_executor(pool, extract_pdf_text_sync, pdf_path, start, min(start + step, page_count))
+        for start in range(0, page_count, step)
+    ))
+    return [page for chunk in chunks for page in chunk]
@@ -1,9 +1,13 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from requests_toolbelt.multipart.encoder import MultipartEncoder
 import time
-import pandas as pd
-import json
+import hashlib
+import orjson
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Load local .env if present
@@ -15,6 +19,149 @@ API_URL = os.getenv("API_URL", "http://localhost:8000")
 if not API_URL.endswith("/ai-assment-generation/api/v1"):
     API_URL = f"{API_URL.rstrip('/')}/ai-assment-generation/api/v1"
 
+# Backend routes, built once; per-job routes take the job id appended
+STATUS_URL = f"{API_URL}/status/"
+PROGRESS_URL = f"{API_URL}/progress/"
+GENERATE_URL = f"{API_URL}/generate_json"
+UPLOAD_BLOB_URL = f"{API_URL}/upload_blob"
+DOWNLOAD_URLS = {
+    "JSON": f"{API_URL}/download_json/",
+    "CSV": f"{API_URL}/download_csv/",
+    "PDF": f"{API_URL}/download_pdf/",
+    "DOCX": f"{API_URL}/download_docx/",
+}
+# Small exports fetched through api_session() and served by Streamlit itself: (extension, mime)
+PREFETCHED_DOWNLOADS = {"JSON": ("json", "application/json"), "CSV": ("csv", "text/csv")}
+
+# (connect, read) timeout for every backend call
+API_TIMEOUT = (3, 30)
+
+@st.cache_resource
+def api_session() -> requests.Session:
+    # One keep-alive connection pool to the backend, shared across reruns and sessions
+    session = requests.Session()
+    # Idempotent calls (GET) retry briefly on gateway errors; POSTs are never retried
+    retries = Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=retries)
+    session.mount(f"{API_URL}/", adapter)
+    return session
+
+@st.cache_data(ttl=2, show_spinner=False)
+def fetch_status(job_id: str):
+    # Rapid reruns (typing, slider drags) share one /status call per job for 2s
+    r = api_session().get(STATUS_URL + job_id, timeout=API_TIMEOUT)
+    return r.status_code, (orjson.loads(r.content) if r.status_code == 200 else {})
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_export(fmt: str, job_id: str) -> bytes:
+    # Re-clicks and reruns reuse the bytes; cleared when a job (re)starts.
+    # Only a 200 is the file (e.g. 202 means "not ready yet"); raising keeps anything else out of the cache.
+    r = api_session().get(DOWNLOAD_URLS[fmt] + job_id, timeout=API_TIMEOUT)
+    if r.status_code != 200:
+        raise requests.exceptions.HTTPError(f"{fmt} export not available (HTTP {r.status_code})", response=r)
+    return r.content
+
+# Parallel /upload_blob calls when several files are attached
+UPLOAD_WORKERS = 4
+# Per-file limit; keep in line with the backend's UPLOAD_MAX_MB
+UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB", "50"))
+
+def upload_blob(session: requests.Session, f) -> str:
+    # Streams one UploadedFile (not a getvalue() copy) to the API and returns its blob id.
+    # Runs on worker threads, so the session is passed in rather than looked up in the cache.
+    f.seek(0)
+    mime_type = "application/pdf" if f.name.endswith(".pdf") else "text/vtt"
+    form = MultipartEncoder(fields=[("file", (f.name, f, mime_type))])
+    r = session.post(
+        UPLOAD_BLOB_URL, data=form,
+        headers={"Content-Type": form.content_type}, timeout=API_TIMEOUT
+    )
+    r.raise_for_status()
+    return r.json()["blob_id"]
+
+@st.cache_resource
+def upload_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="blob-upload")
+
+def discard_blob(session: requests.Session, future):
+    # Deletes the blob of a removed file once its upload (possibly still running) finishes
+    try:
+        session.delete(f"{UPLOAD_BLOB_URL}/{future.result()}", timeout=API_TIMEOUT)
+    except requests.exceptions.RequestException:
+        pass  # the backend sweeps unused blobs anyway
+
+def prepublish(uploaded_files):
+    # Starts uploading each newly attached file right away, so the transfer overlaps
+    # with filling in the rest of the form. Returns ((file, Future or None) pairs in
+    # upload order, names of files over the size limit). None marks a file whose blob
+    # was consumed by a submitted job and must be uploaded again.
+    futures = st.session_state.setdefault('blob_futures', {})
+    session = api_session()
+    current, oversized = {}, []
+    for f in uploaded_files or []:
+        if f.size > UPLOAD_MAX_MB * 1024 * 1024:
+            oversized.append(f.name)
+        else:
+            current[f.file_id] = f
+    for file_id in futures.keys() - current.keys():
+        future = futures.pop(file_id)
+        if future is not None and not future.cancel():
+            upload_pool().submit(discard_blob, session, future)
+    for file_id, f in current.items():
+        if file_id not in futures:
+            futures[file_id] = upload_pool().submit(upload_blob, session, f)
+    if oversized:
+        st.error(f"Over the {UPLOAD_MAX_MB} MB limit, not uploaded: {', '.join(oversized)}")
+    return [(f, futures[file_id]) for file_id, f in current.items()], oversized
+
+# Table rows for the Questions tab, built once per finished job and kept for the session
+def question_view(job_id: str, questions: dict):
+    views = st.session_state.setdefault('question_views', {})
+    if job_id not in views:
+        flat_questions = [(q_type, q) for q_type, q_list in questions.items() for q in q_list]
+        rows = []
+        for q_type, q in flat_questions:
+            if q_type == "MTF Question":
+                choices = " | ".join(f"{p['left']} → {p['right']}" for p in q.get("pairs", []))
+                answer = ""
+            elif q_type in ("Multiple Choice Question", "Multi-Choice Question"):
+                choices = " | ".join(opt['text'] for opt in q.get("options", []))
+                answer = f"Option {q.get('correct_option_index')}" if q_type == "Multiple Choice Question" else str(q.get('correct_option_index'))
+            else:
+                # FTB and True/False
+                choices = ""
+                answer = str(q.get('correct_answer'))
+            rows.append({
+                "Type": q_type,
+                "Question": q.get('question_text', ''),
+                "Options / Pairs": choices,
+                "Answer": answer,
+                "Bloom": q.get('blooms_level', 'N/A'),
+                "Relevance %": q.get('relevance_percentage', 0),
+            })
+        views[job_id] = (flat_questions, rows)
+    return views[job_id]
+
+# Seconds during which an identical /generate_json body is not sent again
+SUBMIT_DEDUP_WINDOW = 30
+
+# Rows per page in the Questions tab
+QUESTIONS_PAGE_SIZE = 20
+
+# /status polling while a job is running: exponential backoff from 1s, capped at 10s.
+# ?poll_interval_ms=N pins a fixed interval instead (floor 200ms), e.g. for tests.
+STATUS_POLL_INITIAL = 1.0
+STATUS_POLL_MAX = 10.0
+STATUS_POLL_FLOOR = 0.2
+# Stop waiting on one job after this long (the backend treats jobs untouched for an hour as lost)
+STATUS_WAIT_DEADLINE = 3600
+
+def poll_delay(attempt: int) -> float:
+    fixed_ms = st.query_params.get("poll_interval_ms")
+    if fixed_ms and fixed_ms.isdigit():
+        return max(STATUS_POLL_FLOOR, int(fixed_ms) / 1000)
+    return min(STATUS_POLL_MAX, STATUS_POLL_INITIAL * 2 ** attempt)
+
 st.set_page_config(page_title="Assessment Generator v3.3", layout="wide")
 
 st.title("Course Assessment Generator (Prompt v3.3)")
@@ -38,18 +185,31 @@ if course_id or use_custom:
     status = "NOT_FOUND" # Default start state
     if current_job_id:
         try:
-            resp = requests.get(f"{API_URL}/status/{current_job_id}")
+            # A finished job's result never changes: keep the parsed payload for this session
+            completed_data = st.session_state.setdefault('completed_data', {})
+            if current_job_id in completed_data:
+                status_code, data = 200, completed_data[current_job_id]
+            else:
+                status_code, data = fetch_status(current_job_id)
+                if status_code == 200 and data.get("status") == "COMPLETED":
+                    # Older rows may carry the JSON columns as strings; parse them once here
+                    for field in ("token_usage", "assessment_data"):
+                        if isinstance(data.get(field), str):
+                            try:
+                                data[field] = orjson.loads(data[field])
+                            except orjson.JSONDecodeError:
+                                pass
+                    completed_data[current_job_id] = data
             
-            if resp.status_code == 404:
+            if status_code == 404:
                 # st.info("No assessment found for this course.") 
                 status = "NOT_FOUND"
-            elif resp.status_code == 200:
-                data = resp.json()
+            elif status_code == 200:
                 status = data.get("status")
                 st.write(f"**Current Status:** {status}")
                 if status == "FAILED":
                     st.error(f"Error: {data.get('error_message')}")
-        except requests.exceptions.ConnectionError:
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
             st.error("Backend API is not running. Please start the FastAPI server.")
             st.stop()
 
@@ -69,108 +229,137 @@ if course_id or use_custom:
                 ["english", "hindi", "bengali", "gujarati", "kannada", "malayalam", "marathi", "tamil", "telugu", "odia", "punjabi", "assamese"]
             )
 
-        # Step 2: Course Inputs
-        if assessment_type == "comprehensive":
-            course_ids_input = st.text_area("Target Course IDs (comma-separated)", value=course_id, placeholder="do_123, do_456, do_789")
-        else:
-            # Single course mode: Use the top-level input directly
-            st.markdown(f"**Target Course:** `{course_id}`")
-            course_ids_input = course_id
+        # Outside the form so attached files start uploading as soon as they are dropped
+        uploaded_files = st.file_uploader("Upload extra content (PDF/VTT)", accept_multiple_files=True, type=['pdf', 'vtt'])
+        pending_uploads, oversized_uploads = prepublish(uploaded_files)
 
-        # Step 3: Question Type Counts
-        st.markdown("#### Question Type Distribution")
-        col_mcq, col_ftb, col_mtf, col_multi, col_tf = st.columns(5)
+        # Everything below is one form: widget edits only rerun the script on submit
+        with st.form("gen_form"):
+            # Step 2: Course Inputs
+            if assessment_type == "comprehensive":
+                course_ids_input = st.text_area("Target Course IDs (comma-separated)", value=course_id, placeholder="do_123, do_456, do_789")
+            else:
+                # Single course mode: Use the top-level input directly
+                st.markdown(f"**Target Course:** `{course_id}`")
+                course_ids_input = course_id
+
+            # Step 3: Question Type Counts
+            st.markdown("#### Question Type Distribution")
+            col_mcq, col_ftb, col_mtf, col_multi, col_tf = st.columns(5)
         
-        with col_mcq:
-            mcq_count = st.number_input(
-                "MCQ Questions",
-                min_value=0,
-                max_value=20,
-                value=5,
-                step=1,
-                help="Multiple Choice (Single Correct)"
-            )
+            with col_mcq:
+                mcq_count = st.number_input(
+                    "MCQ Questions",
+                    min_value=0,
+                    max_value=20,
+                    value=5,
+                    step=1,
+                    help="Multiple Choice (Single Correct)"
+                )
             
-        with col_ftb:
-            ftb_count = st.number_input(
-                "FTB Questions",
-                min_value=0,
-                max_value=20,
-                value=5,
-                step=1,
-                help="Fill in the Blank"
-            )
+            with col_ftb:
+                ftb_count = st.number_input(
+                    "FTB Questions",
+                    min_value=0,
+                    max_value=20,
+                    value=5,
+                    step=1,
+                    help="Fill in the Blank"
+                )
 
-        with col_mtf:
-            mtf_count = st.number_input(
-                "MTF Questions",
-                min_value=0,
-                max_value=20,
-                value=5,
-                step=1,
-                help="Match the Following"
-            )
+            with col_mtf:
+                mtf_count = st.number_input(
+                    "MTF Questions",
+                    min_value=0,
+                    max_value=20,
+                    value=5,
+                    step=1,
+                    help="Match the Following"
+                )
             
-        with col_multi:
-            multi_count = st.number_input(
-                "Multi-Choice",
-                min_value=0,
-                max_value=20,
-                value=0,
-                step=1,
-                help="Multiple Correct Options"
-            )
+            with col_multi:
+                multi_count = st.number_input(
+                    "Multi-Choice",
+                    min_value=0,
+                    max_value=20,
+                    value=0,
+                    step=1,
+                    help="Multiple Correct Options"
+                )
             
-        with col_tf:
-            tf_count = st.number_input(
-                "True/False",
-                min_value=0,
-                max_value=20,
-                value=0,
-                step=1,
-                help="True or False Questions"
-            )
+            with col_tf:
+                tf_count = st.number_input(
+                    "True/False",
+                    min_value=0,
+                    max_value=20,
+                    value=0,
+                    step=1,
+                    help="True or False Questions"
+                )
 
-        total_questions = mcq_count + ftb_count + mtf_count + multi_count + tf_count
-        st.info(f"Total Questions: {total_questions}")
+            total_questions = mcq_count + ftb_count + mtf_count + multi_count + tf_count
+            st.info(f"Total Questions: {total_questions}")
 
-        # Step 4: Additional Config
-        time_limit = st.number_input("Time Limit (Minutes)", min_value=10, max_value=180, value=60, step=10)
+            # Step 4: Additional Config
+            time_limit = st.number_input("Time Limit (Minutes)", min_value=10, max_value=180, value=60, step=10)
 
-        # Step 4: Advanced Config
-        with st.expander("Advanced Configuration (Bloom's & Topics)", expanded=False):
-            topic_names = st.text_input("Prioritize Topics (comma-separated)", placeholder="e.g. Budgeting, Risk Management, Python Basics")
+            # Step 4: Advanced Config
+            with st.expander("Advanced Configuration (Bloom's & Topics)", expanded=False):
+                topic_names = st.text_input("Prioritize Topics (comma-separated)", placeholder="e.g. Budgeting, Risk Management, Python Basics")
             
-            st.markdown("#### Bloom's Taxonomy Distribution (Must sum to 100%)")
-            b_col1, b_col2, b_col3, b_col4, b_col5, b_col6 = st.columns(6)
-            b_remember = b_col1.number_input("Remember %", value=20, min_value=0, max_value=100)
-            b_understand = b_col2.number_input("Understand %", value=25, min_value=0, max_value=100)
-            b_apply = b_col3.number_input("Apply %", value=25, min_value=0, max_value=100)
-            b_analyze = b_col4.number_input("Analyze %", value=20, min_value=0, max_value=100)
-            b_evaluate = b_col5.number_input("Evaluate %", value=10, min_value=0, max_value=100)
-            b_create = b_col6.number_input("Create %", value=0, min_value=0, max_value=100)
-
-            total_blooms = b_remember + b_understand + b_apply + b_analyze + b_evaluate + b_create
-            if total_blooms != 100:
-                st.warning(f"Total Bloom's Percentage: {total_blooms}%. It should be exactly 100%.")
+                st.markdown("#### Bloom's Taxonomy Distribution (Must sum to 100%)")
+                # One editable row: editing the levels triggers one rerun instead of one per input
+                blooms_levels = ["Remember", "Understand", "Apply", "Analyze", "Evaluate", "Create"]
+                blooms_row = st.data_editor(
+                    [{"Remember": 20, "Understand": 25, "Apply": 25, "Analyze": 20, "Evaluate": 10, "Create": 0}],
+                    num_rows="fixed", hide_index=True, use_container_width=True, key="blooms",
+                    column_config={
+                        level: st.column_config.NumberColumn(f"{level} %", min_value=0, max_value=100, step=1, required=True)
+                        for level in blooms_levels
+                    },
+                )[0]
+                b_remember, b_understand, b_apply, b_analyze, b_evaluate, b_create = (int(blooms_row[level]) for level in blooms_levels)
 
-        uploaded_files = st.file_uploader("Upload extra content (PDF/VTT)", accept_multiple_files=True, type=['pdf', 'vtt'])
-        additional_instructions = st.text_area("Additional Instructions (SME notes)", placeholder="e.g. Focus on Chapter 3, exclude technical jargon...")
+                total_blooms = b_remember + b_understand + b_apply + b_analyze + b_evaluate + b_create
+
+            additional_instructions = st.text_area("Additional Instructions (SME notes)", placeholder="e.g. Focus on Chapter 3, exclude technical jargon...")
         
-        if st.button("Start Generation"):
+            submitted = st.form_submit_button("Start Generation")
+
+        if submitted:
             if total_blooms != 100:
-                st.error("Cannot start: Bloom's Taxonomy distribution must equal 100%.")
+                st.error(f"Cannot start: Bloom's Taxonomy distribution must equal 100% (currently {total_blooms}%).")
                 st.stop()
 
             if total_questions == 0:
                 st.error("Please specify at least one question (MCQ, FTB, or MTF).")
                 st.stop()
 
-            files = []
-            if uploaded_files:
-                for f in uploaded_files:
-                    mime_type = "application/pdf" if f.name.endswith(".pdf") else "text/vtt"
-                    files.append(('files', (f.name, f.getvalue(), mime_type)))
+            if oversized_uploads:
+                st.error(f"Cannot start: remove files over {UPLOAD_MAX_MB} MB ({', '.join(oversized_uploads)}).")
+                st.stop()
+
+            # Files were uploaded in the background since they were attached; collect their ids.
+            # Blobs already used by an earlier job are gone from the backend, so re-upload those.
+            blob_futures = st.session_state['blob_futures']
+            for i, (f, future) in enumerate(pending_uploads):
+                if future is None:
+                    future = blob_futures[f.file_id] = upload_pool().submit(upload_blob, api_session(), f)
+                    pending_uploads[i] = (f, future)
+            blob_ids = []
+            if pending_uploads:
+                with st.status(f"Uploading {len(pending_uploads)} file(s)...") as upload_box:
+                    for done, (f, future) in enumerate(pending_uploads, start=1):
+                        try:
+                            blob_ids.append(future.result())
+                        except requests.exceptions.RequestException as e:
+                            # Forget the failed attempt so the next submit retries it
+                            st.session_state['blob_futures'].pop(f.file_id, None)
+                            upload_box.update(label="Upload failed", state="error")
+                            st.error(f"Failed to upload {f.name}: {e}")
+                            st.stop()
+                        upload_box.update(label=f"Uploaded {done}/{len(pending_uploads)} file(s)")
+                    upload_box.update(state="complete")
 
             # Construct Payload
             blooms_config = {
@@ -182,7 +371,7 @@ if course_id or use_custom:
                 "Create": b_create
             }
 
-            # Build question_type_counts JSON
+            # Build question_type_counts
             question_type_counts_dict = {}
             q_types_list = []
 
@@ -202,68 +391,115 @@ if course_id or use_custom:
                 question_type_counts_dict["truefalse"] = tf_count
                 q_types_list.append("truefalse")
 
-            q_types_str = ",".join(q_types_list)
-            question_type_counts_json = json.dumps(question_type_counts_dict)
-
-            payload = {
-                'course_ids': course_ids_input,
-                'force': 'true',
+            # One JSON body: counts and Bloom's config go over as native objects, not JSON-in-form strings
+            body = {
+                'course_ids': [c.strip() for c in course_ids_input.split(",") if c.strip()],
+                'force': True,
                 'assessment_type': assessment_type,
                 'difficulty': difficulty,
                 'total_questions': total_questions,
-                'question_type_counts': question_type_counts_json,
-                'question_types': q_types_str,
+                'question_type_counts': question_type_counts_dict,
+                'question_types': q_types_list,
                 'time_limit': time_limit,
-                'topic_names': topic_names,
-                'blooms_config': json.dumps(blooms_config),
-                'additional_instructions': additional_instructions,
-                'language': language
+                'topic_names': [t.strip() for t in topic_names.split(",") if t.strip()] or None,
+                'blooms_config': blooms_config,
+                'additional_instructions': additional_instructions or None,
+                'language': language,
+                'blob_ids': blob_ids
             }
             
+            # A double click reruns the script with the same form values; send each distinct request once.
+            # (The backend also maps identical in-flight requests onto the same job id.)
+            submit_key = hashlib.sha256(orjson.dumps(body, option=orjson.OPT_SORT_KEYS)).hexdigest()
+            last_key, last_ts = st.session_state.get('last_submit', (None, 0.0))
+            if submit_key == last_key and time.monotonic() - last_ts < SUBMIT_DEDUP_WINDOW:
+                st.warning("This request was just submitted; waiting for the job to start...")
+                st.stop()
+            st.session_state['last_submit'] = (submit_key, time.monotonic())
+
             with st.spinner("Initiating job..."):
-                r = requests.post(f"{API_URL}/generate", data=payload, files=files)
+                r = api_session().post(GENERATE_URL, json=body, timeout=API_TIMEOUT)
                 if r.status_code == 200:
                     data = r.json()
                     new_job_id = data.get("job_id")
                     st.session_state['active_job_id'] = new_job_id
+                    # The job owns (and deletes) the submitted blobs
+                    for file_id in blob_futures:
+                        blob_futures[file_id] = None
+                    # Regenerating reuses the job id, so drop its stored result
+                    st.session_state.get('completed_data', {}).pop(new_job_id, None)
+                    st.session_state.get('question_views', {}).pop(new_job_id, None)
                     st.success(f"Job started! ID: {new_job_id}")
+                    fetch_status.clear()
+                    fetch_export.clear()
                     time.sleep(2)
                     st.rerun()
                 else:
+                    # Let the user retry the same request straight away
+                    st.session_state.pop('last_submit', None)
                     st.error(f"Failed to start job: {r.text}")
 
     elif status == "IN_PROGRESS" or status == "PENDING":
         st.info(f"Generation in progress for Job ID: {current_job_id}... Please wait.")
-        progress_bar = st.progress(0)
-        for i in range(100):
-            time.sleep(0.1)
-            progress_bar.progress(i + 1)
-        
-        time.sleep(2)
+        # Follow the backend's /progress event stream until the job finishes, then rerun once to show it.
+        # If the stream is unavailable or drops, poll /status (with backoff) instead.
+        started = time.monotonic()
+        deadline = started + STATUS_WAIT_DEADLINE
+        attempt = 0
+        with st.status(f"Job {status}...", expanded=False) as status_box:
+            bar = st.progress(0)
+            try:
+                # identity: a gzip'd event stream would be buffered instead of delivered per event
+                with api_session().get(PROGRESS_URL + current_job_id, stream=True, timeout=API_TIMEOUT,
+                                       headers={"Accept-Encoding": "identity"}) as stream:
+                    if stream.status_code == 200:
+                        # Keepalives arrive every few seconds, so the deadline is checked even while nothing changes
+                        for line in stream.iter_lines():
+                            if time.monotonic() > deadline:
+                                break
+                            if not line.startswith(b"data:"):
+                                continue
+                            event = orjson.loads(line[5:])
+                            status = event["stage"]
+                            bar.progress(event["pct"], text=status.title())
+                            status_box.update(label=f"Job {status}... {int(time.monotonic() - started)}s elapsed")
+            except requests.exceptions.RequestException:
+                pass
+            if status not in ("COMPLETED", "FAILED"):
+                status = "IN_PROGRESS"
+            try:
+                while status in ("IN_PROGRESS", "PENDING") and time.monotonic() < deadline:
+                    time.sleep(poll_delay(attempt))
+                    poll = api_session().get(STATUS_URL + current_job_id, timeout=API_TIMEOUT)
+                    if poll.status_code != 200:
+                        break
+                    new_status = orjson.loads(poll.content).get("status")
+                    # Back off while nothing changes; start over on a state transition
+                    attempt = 0 if new_status != status else attempt + 1
+                    status = new_status
+                    status_box.update(label=f"Job {status}... {int(time.monotonic() - started)}s elapsed")
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                status_box.update(label="Lost connection to the backend", state="error")
+                st.error("Backend API is not running. Please start the FastAPI server.")
+                st.stop()
+            if status in ("IN_PROGRESS", "PENDING"):
+                status_box.update(label=f"Job still {status} after {STATUS_WAIT_DEADLINE // 60} min", state="error")
+                st.warning("Stopped waiting for this job. Reload the page to check on it again.")
+                st.stop()
+        fetch_status.clear()
         st.rerun()
 
     elif status == "COMPLETED":
         st.success("Assessment Generated Successfully!")
         
-        # Show details
-        data = resp.json()
+        # Show details (`data` is the parsed status payload from above)
         
         st.subheader("Token Usage")
         token_usage = data.get("token_usage", {})
-        if isinstance(token_usage, str):
-            try:
-                token_usage = json.loads(token_usage)
-            except:
-                pass
         st.json(token_usage, expanded=False)
 
         st.subheader("Assessment Results")
         assessment_data = data.get("assessment_data", {})
-        if isinstance(assessment_data, str):
-            try:
-                assessment_data = json.loads(assessment_data)
-            except:
-                pass
         
         tab1, tab2 = st.tabs(["Blueprint", "Questions"])
         
@@ -273,51 +509,51 @@ if course_id or use_custom:
             st.json(blueprint)
             
         with tab2:
+            # One Arrow-backed table for all questions; details only for the selected row
             questions = assessment_data.get("questions", {})
-            for q_type, q_list in questions.items():
-                with st.expander(f"{q_type} ({len(q_list)} items)"):
-                    for q in q_list:
-                        st.markdown(f"**Q: {q.get('question_text', '')}**")
-                        if q_type == "Multiple Choice Question":
-                            for opt in q.get("options", []):
-                                st.write(f"- {opt['text']}")
-                            st.info(f"Answer: Option {q.get('correct_option_index')}")
-                        elif q_type == "Multi-Choice Question":
-                             for opt in q.get("options", []):
-                                st.write(f"- {opt['text']}")
-                             st.info(f"Correct Options: {q.get('correct_option_index')}")
-                        elif q_type == "MTF Question":
-                            for p in q.get("pairs", []):
-                                st.write(f"- {p['left']} → {p['right']}")
-                        else:
-                            # FTB and True/False
-                            st.info(f"Answer: {q.get('correct_answer')}")
-                        
-                        # Explainability Section
-                        reasoning = q.get('reasoning', {})
-                        kcm = reasoning.get('competency_alignment', {}).get('kcm', {})
-                        
-                        rel_pct = q.get('relevance_percentage', 0)
-                        st.write(f"**Relevance:** `{rel_pct}%` | **Bloom:** `{q.get('blooms_level', 'N/A')}`")
-                        
-                        with st.expander("View SME Alignment & Reasoning"):
-                            st.markdown(f"**Learning Objective:** {reasoning.get('learning_objective_alignment')}")
-                            st.markdown(f"**KCM Competency:** {kcm.get('competency_area')} → {kcm.get('competency_theme')} → {kcm.get('competency_sub_theme')}")
-                            if reasoning.get('competency_alignment', {}).get('domain'):
-                                st.markdown(f"**Domain Mapping:** {reasoning.get('competency_alignment', {}).get('domain')}")
-                            st.markdown(f"**Bloom Justification:** {reasoning.get('blooms_level_justification')}")
-                            st.markdown(f"**Difficulty Justification:** {reasoning.get('difficulty_justification')}")
-                            st.markdown(f"**Rationale:** {reasoning.get('question_type_rationale')}")
-                        st.divider()
+            flat_questions, question_rows = question_view(current_job_id, questions)
+            # Page the table so each rerun only builds and ships QUESTIONS_PAGE_SIZE rows
+            last_page = max(0, (len(flat_questions) - 1) // QUESTIONS_PAGE_SIZE)
+            page = st.number_input("Page", min_value=0, max_value=last_page, value=0, step=1, key="questions_page") if last_page else 0
+            page_start = page * QUESTIONS_PAGE_SIZE
+            page_questions = flat_questions[page_start:page_start + QUESTIONS_PAGE_SIZE]
+            rows = question_rows[page_start:page_start + QUESTIONS_PAGE_SIZE]
+
+            st.caption(" | ".join(f"{q_type}: {len(q_list)}" for q_type, q_list in questions.items())
+                       + f" — showing {page_start + 1 if page_questions else 0}-{page_start + len(page_questions)} of {len(flat_questions)}")
+            event = st.dataframe(
+                rows, use_container_width=True, hide_index=True,
+                on_select="rerun", selection_mode="single-row", key=f"questions_table_{page}"
+            )
+
+            selected = event.selection.rows
+            if selected:
+                q_type, q = page_questions[selected[0]]
+                reasoning = q.get('reasoning', {})
+                kcm = reasoning.get('competency_alignment', {}).get('kcm', {})
+
+                st.markdown(f"**SME Alignment & Reasoning - Q: {q.get('question_text', '')}**")
+                st.markdown(f"**Learning Objective:** {reasoning.get('learning_objective_alignment')}")
+                st.markdown(f"**KCM Competency:** {kcm.get('competency_area')} → {kcm.get('competency_theme')} → {kcm.get('competency_sub_theme')}")
+                if reasoning.get('competency_alignment', {}).get('domain'):
+                    st.markdown(f"**Domain Mapping:** {reasoning.get('competency_alignment', {}).get('domain')}")
+                st.markdown(f"**Bloom Justification:** {reasoning.get('blooms_level_justification')}")
+                st.markdown(f"**Difficulty Justification:** {reasoning.get('difficulty_justification')}")
+                st.markdown(f"**Rationale:** {reasoning.get('question_type_rationale')}")
+            else:
+                st.caption("Select a row to view its SME alignment and reasoning.")
         
         # Download
         st.subheader("Download Results")
-        col_dl1, col_dl2, col_dl3, col_dl4 = st.columns(4)
-        with col_dl1:
-            st.link_button("Download JSON", f"{API_URL}/download_json/{current_job_id}")
-        with col_dl2:
-            st.link_button("Download CSV", f"{API_URL}/download_csv/{current_job_id}")
-        with col_dl3:
-            st.link_button("Download PDF", f"{API_URL}/download_pdf/{current_job_id}")
-        with col_dl4:
-            st.link_button("Download DOCX", f"{API_URL}/download_docx/{current_job_id}")
+        for col, (fmt, url) in zip(st.columns(len(DOWNLOAD_URLS)), DOWNLOAD_URLS.items()):
+            with col:
+                if fmt in PREFETCHED_DOWNLOADS:
+                    ext, mime = PREFETCHED_DOWNLOADS[fmt]
+                    try:
+                        st.download_button(f"Download {fmt}", data=fetch_export(fmt, current_job_id),
+                                           file_name=f"{current_job_id}_assessment.{ext}", mime=mime)
+                        continue
+                    except requests.exceptions.RequestException:
+                        pass
+                # PDF/DOCX are rendered on first request, so the browser fetches them only on click
+                st.link_button(f"Download {fmt}", url + current_job_id)